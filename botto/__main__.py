@@ -1,40 +1,20 @@
-import logging
-import sys
-
-from botto import config
+from botto.cluster import worker_options
 from botto.core import Botto
+from botto.utils.logs import setup_logging
 
-# Logging
-dpy_logger: logging.Logger = logging.getLogger("discord")
-dpy_logger.setLevel(logging.WARNING)
-logger: logging.Logger = logging.getLogger("botto")
-logger.setLevel(logging.INFO)
-
-formatter: logging.Formatter = logging.Formatter(
-    "[{asctime}] [{levelname:>8}] {name}: {message}", style="{"
-)
-
-stream_handler: logging.StreamHandler = logging.StreamHandler(sys.stdout)
-file_handler: logging.FileHandler = logging.FileHandler(
-    filename="botto.log", encoding="utf-8", mode="w"
-)
-error_file_handler: logging.FileHandler = logging.FileHandler(
-    filename="error.log", encoding="utf-8", mode="w"
-)
-
-stream_handler.setFormatter(formatter)
-file_handler.setFormatter(formatter)
-error_file_handler.setFormatter(formatter)
-error_file_handler.setLevel(logging.ERROR)
+# Process pool workers started by spawn import this module under another name
+if __name__ == "__main__":
+    # Shards and IPC settings when started by the cluster launcher
+    options = worker_options()
 
-dpy_logger.addHandler(stream_handler)
-dpy_logger.addHandler(file_handler)
-dpy_logger.addHandler(error_file_handler)
-logger.addHandler(stream_handler)
-logger.addHandler(file_handler)
-logger.addHandler(error_file_handler)
+    # Logging
+    log_listener = setup_logging(options.get("cluster_id"))
+    log_listener.start()
 
-# Bot
-bot: Botto = Botto()
+    # Bot
+    bot: Botto = Botto(**options)
 
-bot.run()
+    try:
+        bot.run()
+    finally:
+        log_listener.stop()
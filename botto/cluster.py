@@ -0,0 +1,323 @@
+"""Launcher running the bot's shards across several worker processes.
+
+Run with ``python -m botto.cluster`` instead of ``python -m botto``. The shards
+are split into CLUSTER_COUNT clusters, each run by a worker process started as
+``python -m botto`` with its shard IDs in the environment. Workers which exit
+with an error are restarted. Workers connect back to the launcher to aggregate
+statistics and broadcast module loading, see botto/core/ipc.py.
+"""
+
+import asyncio
+import logging
+import os
+import secrets
+import signal
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from discord.http import HTTPClient
+
+import botto
+from botto.core.ipc import LINE_LIMIT, read_message, write_message
+from botto.utils.logs import setup_logging
+
+logger = logging.getLogger("botto.cluster")
+
+# Environment variables passing cluster settings to workers
+ENV_CLUSTER_ID = "BOTTO_CLUSTER_ID"
+ENV_SHARD_IDS = "BOTTO_SHARD_IDS"
+ENV_SHARD_COUNT = "BOTTO_SHARD_COUNT"
+ENV_IPC_PORT = "BOTTO_IPC_PORT"
+ENV_IPC_TOKEN = "BOTTO_IPC_TOKEN"
+
+# Requests which are run by every worker, with results keyed by cluster ID
+BROADCAST_ACTIONS = frozenset({"stats", "load", "unload", "reload"})
+
+
+def worker_options() -> Dict[str, Any]:
+    """Return Botto keyword arguments of a worker started by the launcher.
+
+    Empty when the bot was not started by the launcher.
+    """
+    if ENV_CLUSTER_ID not in os.environ:
+        return {}
+    return {
+        "cluster_id": int(os.environ[ENV_CLUSTER_ID]),
+        "shard_ids": [int(i) for i in os.environ[ENV_SHARD_IDS].split(",")],
+        "shard_count": int(os.environ[ENV_SHARD_COUNT]),
+        "ipc_port": int(os.environ[ENV_IPC_PORT]),
+        "ipc_token": os.environ[ENV_IPC_TOKEN],
+    }
+
+
+def split_shards(shard_count: int, cluster_count: int) -> List[List[int]]:
+    """Split shard IDs into consecutive runs of nearly equal size."""
+    return [
+        list(
+            range(
+                i * shard_count // cluster_count, (i + 1) * shard_count // cluster_count
+            )
+        )
+        for i in range(cluster_count)
+    ]
+
+
+async def fetch_shard_count(token: str) -> int:
+    """Return the number of shards recommended by Discord."""
+    http = HTTPClient()
+    try:
+        await http.static_login(token, bot=True)
+        shard_count, _ = await http.get_bot_gateway()
+    finally:
+        await http.close()
+    return shard_count
+
+
+class Cluster:
+    """A worker process running some of the shards, restarted if it fails."""
+
+    def __init__(
+        self, cluster_id: int, shard_ids: List[int], environment: Dict[str, str]
+    ) -> None:
+        self.id: int = cluster_id
+        self.shard_ids: List[int] = shard_ids
+        self.environment: Dict[str, str] = {
+            **environment,
+            ENV_CLUSTER_ID: str(cluster_id),
+            ENV_SHARD_IDS: ",".join(map(str, shard_ids)),
+        }
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.ready: asyncio.Event = asyncio.Event()
+        self.started_at: float = 0.0
+        self.restarts: int = 0
+        self.stopping: bool = False
+
+    def __repr__(self) -> str:
+        return f"<Cluster id={self.id} shards={self.shard_ids[0]}-{self.shard_ids[-1]}>"
+
+    async def start(self) -> None:
+        self.ready.clear()
+        self.started_at = time.monotonic()
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "botto", env=self.environment
+        )
+        logger.info("Started %r as process %d.", self, self.process.pid)
+        if self.stopping:
+            self.process.terminate()
+
+    def stop(self) -> None:
+        self.stopping = True
+        if self.process is not None and self.process.returncode is None:
+            self.process.terminate()
+
+    async def supervise(self, base_delay: float, max_delay: float) -> None:
+        """Wait for the worker to exit and restart it unless it exited cleanly."""
+        delay = base_delay
+        while True:
+            assert self.process is not None
+            code = await self.process.wait()
+            self.ready.set()  # Do not hold up clusters waiting to start
+            if self.stopping or code == 0:
+                logger.info("%r exited with code %d.", self, code)
+                return
+            # Back off while the worker keeps crashing soon after starting
+            if time.monotonic() - self.started_at > max_delay:
+                delay = base_delay
+            logger.error(
+                "%r exited with code %d, restarting in %.0f seconds.", self, code, delay
+            )
+            await asyncio.sleep(delay)
+            if self.stopping:
+                return
+            delay = min(delay * 2, max_delay)
+            self.restarts += 1
+            await self.start()
+
+
+class Launcher:
+    """Start the clusters one after another and answer their requests."""
+
+    def __init__(self, shard_count: int, cluster_count: int) -> None:
+        self.shard_count: int = shard_count
+        self.port: int = botto.config.get("IPC_PORT", 4000)
+        self.token: str = secrets.token_hex(16)
+        self.timeout: float = botto.config.get("IPC_TIMEOUT", 10.0)
+        environment = {
+            **os.environ,
+            ENV_SHARD_COUNT: str(shard_count),
+            ENV_IPC_PORT: str(self.port),
+            ENV_IPC_TOKEN: self.token,
+        }
+        self.clusters: Dict[int, Cluster] = {
+            cluster_id: Cluster(cluster_id, shard_ids, environment)
+            for cluster_id, shard_ids in enumerate(
+                split_shards(shard_count, min(cluster_count, shard_count))
+            )
+        }
+        self.stopped: asyncio.Event = asyncio.Event()
+        # Nonce of a command to the futures of its results by cluster ID
+        self._results: Dict[str, Dict[int, asyncio.Future]] = {}
+
+    async def run(self) -> None:
+        server = await asyncio.start_server(
+            self.handle_connection, "127.0.0.1", self.port, limit=LINE_LIMIT
+        )
+        logger.info(
+            "Running %d shards in %d clusters, listening on port %d.",
+            self.shard_count,
+            len(self.clusters),
+            self.port,
+        )
+        supervisors: List[asyncio.Task] = []
+        try:
+            for cluster in self.clusters.values():
+                await cluster.start()
+                supervisors.append(
+                    asyncio.ensure_future(
+                        cluster.supervise(
+                            botto.config.get("CLUSTER_RESTART_DELAY", 5.0), 300.0
+                        )
+                    )
+                )
+                # Shards identify one at a time, so the next cluster waits its turn
+                try:
+                    await asyncio.wait_for(
+                        cluster.ready.wait(),
+                        botto.config.get("CLUSTER_START_TIMEOUT", 10.0)
+                        * len(cluster.shard_ids),
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning("%r is not ready yet, starting the next.", cluster)
+                if self.stopped.is_set():
+                    break
+            await asyncio.gather(*supervisors)
+        finally:
+            self.stop()
+            await asyncio.gather(*supervisors, return_exceptions=True)
+            server.close()
+            await server.wait_closed()
+            logger.info("All clusters have exited.")
+
+    def stop(self) -> None:
+        self.stopped.set()
+        for cluster in self.clusters.values():
+            cluster.stop()
+
+    # ------ IPC ------
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        cluster: Optional[Cluster] = None
+        try:
+            identify = await read_message(reader)
+            if (
+                identify is None
+                or identify.get("op") != "identify"
+                or not secrets.compare_digest(str(identify.get("token")), self.token)
+                or identify.get("cluster_id") not in self.clusters
+            ):
+                logger.warning("Rejected a connection which did not identify.")
+                return
+            cluster = self.clusters[identify["cluster_id"]]
+            cluster.writer = writer
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    return
+                op = message.get("op")
+                if op == "ready":
+                    logger.info("%r is ready.", cluster)
+                    cluster.ready.set()
+                elif op == "request":
+                    asyncio.ensure_future(self.handle_request(writer, message))
+                elif op == "result":
+                    futures = self._results.get(message["nonce"], {})
+                    future = futures.get(cluster.id)
+                    if future is not None and not future.done():
+                        future.set_result(message)
+        except (OSError, ValueError) as e:
+            logger.warning("Lost connection to %r: %s", cluster, e)
+        finally:
+            if cluster is not None and cluster.writer is writer:
+                cluster.writer = None
+            writer.close()
+
+    async def handle_request(
+        self, writer: asyncio.StreamWriter, message: Dict[str, Any]
+    ) -> None:
+        action = message.get("action")
+        reply: Dict[str, Any] = {"op": "reply", "nonce": message["nonce"]}
+        if action in BROADCAST_ACTIONS:
+            reply["data"] = await self.broadcast(action, message.get("args") or {})
+        elif action == "shutdown":
+            reply["data"] = None
+            self.stop()
+        else:
+            reply["error"] = f"Unknown action {action!r}."
+        write_message(writer, reply)
+
+    async def broadcast(self, action: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a command on every connected worker, return results by cluster ID.
+
+        Results are the command's data, or {"error": ...} if it failed or timed out.
+        Cluster IDs are strings, as they are sent as JSON object keys.
+        """
+        nonce = secrets.token_hex(8)
+        loop = asyncio.get_event_loop()
+        futures: Dict[int, asyncio.Future] = {}
+        for cluster in self.clusters.values():
+            if cluster.writer is None:
+                continue
+            futures[cluster.id] = loop.create_future()
+            write_message(
+                cluster.writer,
+                {"op": "command", "nonce": nonce, "action": action, "args": args},
+            )
+        self._results[nonce] = futures
+        try:
+            if futures:
+                await asyncio.wait(list(futures.values()), timeout=self.timeout)
+        finally:
+            del self._results[nonce]
+        results: Dict[str, Any] = {}
+        for cluster_id in self.clusters:
+            future = futures.get(cluster_id)
+            if future is None:
+                results[str(cluster_id)] = {"error": "Not connected."}
+            elif not future.done():
+                results[str(cluster_id)] = {"error": "Timed out."}
+                future.cancel()
+            else:
+                result = future.result()
+                results[str(cluster_id)] = (
+                    {"error": result["error"]} if "error" in result else result["data"]
+                )
+        return results
+
+
+def main() -> None:
+    log_listener = setup_logging("launcher")
+    log_listener.start()
+    loop = asyncio.get_event_loop()
+    try:
+        shard_count: int = botto.config.get("SHARD_COUNT") or loop.run_until_complete(
+            fetch_shard_count(botto.config["TOKEN"])
+        )
+        cluster_count: int = botto.config.get("CLUSTER_COUNT") or os.cpu_count() or 1
+        launcher = Launcher(shard_count, cluster_count)
+        try:
+            loop.add_signal_handler(signal.SIGINT, launcher.stop)
+            loop.add_signal_handler(signal.SIGTERM, launcher.stop)
+        except NotImplementedError:
+            pass
+        loop.run_until_complete(launcher.run())
+    finally:
+        loop.close()
+        log_listener.stop()
+
+
+if __name__ == "__main__":
+    main()
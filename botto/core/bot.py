@@ -1,13 +1,19 @@
 import asyncio
+import collections
+import concurrent.futures
 import datetime
+import functools
+import importlib
 import itertools
 import logging
+import multiprocessing
+import os
 import signal
-from typing import Any, Generator, List, Optional
+import time
+from typing import Any, Callable, Counter, Dict, Generator, List, Optional
 
 import aiohttp
 import asyncpg
-import jinja2
 import psutil
 from gino import Gino
 
@@ -15,10 +21,21 @@ import discord
 from discord.client import _cleanup_loop
 from discord.ext import commands
 from discord.ext import tasks
+from discord.ext.commands.view import StringView
 
 import botto
+from . import cache
+from .command import clear_docstring_cache
 from .context import Context
 from .errors import BotMissingFundamentalPermissions
+from .executors import TrackedExecutor, collect_executors
+from .ipc import IPCClient
+from .loopmonitor import LoopMonitor, Stall
+from .metrics import Metrics
+from .prefix import PrefixMatcher
+from .profiler import QueryProfiler
+from .sampler import ProcessSampler
+from .sessions import SessionRegistry
 
 try:
     import ujson as json
@@ -34,29 +51,148 @@ else:
 
 logger = logging.getLogger("botto")
 
+# read_messages is an implicit requirement.
+# The check wouldn't run if it didn't read a command message. (duh)
+FUNDAMENTAL_PERMISSIONS: int = discord.Permissions(
+    send_messages=True,
+    embed_links=True,
+    attach_files=True,
+    read_message_history=True,
+    external_emojis=True,
+    add_reactions=True,
+).value
+
+# Forking once threads run can copy their locks while held, so process pool
+# workers start from a clean server process, or a new interpreter on Windows
+PROCESS_START_METHOD: str = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
 
 class Botto(commands.AutoShardedBot):
 
     db = Gino()
 
-    def __init__(self, **kwargs: Any) -> None:
+    def __init__(
+        self,
+        *,
+        cluster_id: Optional[int] = None,
+        ipc_port: Optional[int] = None,
+        ipc_token: Optional[str] = None,
+        **kwargs: Any,
+    ) -> None:
+        # Intents, member cache flags, message cache size and chunking
+        self.cache_options: Dict[str, Any] = cache.client_options(
+            botto.config.get("CACHE_PROFILE", "full"),
+            botto.config.get("CACHE_OVERRIDES"),
+        )
         super().__init__(
             command_prefix=commands.when_mentioned_or(*botto.config["PREFIXES"]),
             pm_help=False,
             owner_id=botto.config["OWNER_ID"],
-            **kwargs,
+            **{**self.cache_options, **kwargs},
         )
         self.ready_time: Optional[datetime.datetime] = None
+        # Help embeds and templates of cogs and commands, built on first use by the
+        # help command and dropped whenever an extension is (un)loaded
+        self.help_cache: Dict[Any, Any] = {}
+        self.guild_prefixes: Dict[int, List[str]] = {}
+        self._prefix_matchers: Dict[Optional[int], PrefixMatcher] = {}
+        # Number of messages processed or rejected before command processing by reason
+        self.message_stats: Counter[str] = collections.Counter()
+        # Channel ID to the bits of fundamental permissions missing in the channel
+        self._missing_permissions: Dict[int, int] = {}
 
         self.process: psutil.Process = psutil.Process()
+        # Startup phase to seconds taken, reported once ready
+        self.startup_times: Dict[str, float] = {}
+        self._run_started: float = 0.0
+        self.setup_complete: asyncio.Event = asyncio.Event()
+
+        self.metrics: Metrics = Metrics(botto.config.get("METRICS_SAMPLES", 1024))
+        self.metrics.collectors.append(self._collect_message_stats)
+        self.query_profiler: QueryProfiler = QueryProfiler(
+            botto.config.get("SLOW_QUERY_THRESHOLD_MS", 100) / 1000
+        )
+        self.metrics.collectors.append(self.query_profiler.collect)
+        self.metrics.collectors.append(self._collect_pool_stats)
+
+        # "cpu" for rendering and parsing in other processes, away from the GIL,
+        # and "io" for blocking calls. Pools are created when first used.
+        cpu_workers: int = (
+            botto.config.get("CPU_EXECUTOR_WORKERS") or os.cpu_count() or 1
+        )
+        io_workers: int = botto.config.get("IO_EXECUTOR_WORKERS") or 8
+        self.executors: Dict[str, TrackedExecutor] = {
+            "cpu": TrackedExecutor(
+                "cpu",
+                functools.partial(
+                    concurrent.futures.ProcessPoolExecutor,
+                    max_workers=cpu_workers,
+                    mp_context=multiprocessing.get_context(PROCESS_START_METHOD),
+                ),
+                cpu_workers,
+            ),
+            "io": TrackedExecutor(
+                "io",
+                functools.partial(
+                    concurrent.futures.ThreadPoolExecutor,
+                    max_workers=io_workers,
+                    thread_name_prefix="botto-io",
+                ),
+                io_workers,
+            ),
+        }
+        self.metrics.collectors.append(self._collect_executor_stats)
+
+        self.loop_monitor: LoopMonitor = LoopMonitor(
+            interval=botto.config.get("LOOP_MONITOR_INTERVAL", 0.1),
+            threshold=botto.config.get("SLOW_CALLBACK_THRESHOLD_MS", 250) / 1000,
+            on_stall=self._report_stall,
+            loop=self.loop,
+        )
+        self.metrics.collectors.append(self.loop_monitor.collect)
+        # Location of a stall to the loop time it was last reported to the console
+        self._stall_reports: Dict[str, float] = {}
+
+        self.sampler: ProcessSampler = ProcessSampler(
+            self.process,
+            functools.partial(self.run_in_executor, executor="io"),
+            interval=botto.config.get("PROCESS_SAMPLE_INTERVAL", 10.0),
+            size=botto.config.get("PROCESS_SAMPLES", 360),
+            read_lag=self.loop_monitor.pop_max_lag,
+            loop=self.loop,
+        )
+        self.metrics.collectors.append(self.sampler.collect)
 
         self.session: aiohttp.ClientSession = aiohttp.ClientSession(
-            loop=self.loop, json_serialize=json.dumps, raise_for_status=True
+            loop=self.loop,
+            json_serialize=json.dumps,
+            raise_for_status=True,
+            trace_configs=[self.metrics.http_trace_config()],
+        )
+
+        self.sessions: SessionRegistry = SessionRegistry(
+            timeout=botto.config.get("SESSION_TIMEOUT", 300.0), loop=self.loop
         )
+        self.metrics.collectors.append(self.sessions.collect)
+
+        # Set when run by the cluster launcher, see botto/cluster.py
+        self.cluster_id: Optional[int] = cluster_id
+        self.ipc: Optional[IPCClient] = None
+        if cluster_id is not None and ipc_port is not None and ipc_token:
+            self.ipc = IPCClient(cluster_id, ipc_port, ipc_token, loop=self.loop)
+            self.ipc.handlers.update(
+                load=self.load_extension,
+                unload=self.unload_extension,
+                reload=self.reload_extension,
+            )
 
+        self.add_cog(botto.utils.PaginatorRegistry(self))
         self.add_check(self._check_fundamental_permissions)
         self.after_invoke(self.unlock_after_invoke)
         self.maintain_presence.start()  # pylint: disable=no-member
+        self.sampler.start()
 
     # ------ Properties ------
 
@@ -112,28 +248,144 @@ class Botto(commands.AutoShardedBot):
 
     # ------ Basic methods ------
 
+    @property
+    def pool(self) -> asyncpg.Pool:
+        """The asyncpg pool of the Gino engine, the only database connection pool."""
+        return self.db.bind.raw_pool
+
     async def connect_to_database(self, dsn: str) -> None:
-        self.pool: asyncpg.Pool = await asyncpg.create_pool(dsn)
+        await self.db.set_bind(
+            dsn,
+            min_size=botto.config.get("DATABASE_POOL_MIN_SIZE", 2),
+            max_size=botto.config.get("DATABASE_POOL_MAX_SIZE", 10),
+            statement_cache_size=botto.config.get(
+                "DATABASE_STATEMENT_CACHE_SIZE", 1024
+            ),
+            max_inactive_connection_lifetime=botto.config.get(
+                "DATABASE_MAX_INACTIVE_CONNECTION_LIFETIME", 300.0
+            ),
+        )
+        self.query_profiler.install(self.db.bind)
+
+    async def warm_up_pool(self) -> None:
+        """Prepare the warm_up_queries of cogs on min_size connections of the pool.
+
+        The connections are held at once so that each one is opened, has its types
+        introspected and caches the statements before the first command needs them.
+        Queries on tables which were not created are skipped.
+        """
+        queries = [
+            (self.db.text(query), params)
+            for cog in self.cogs.values()
+            for query, params in getattr(cog, "warm_up_queries", ())
+        ]
+        start = time.perf_counter()
+
+        async def warm_up_connection() -> None:
+            async with self.db.acquire() as conn:
+                for clause, params in queries:
+                    try:
+                        await conn.all(clause, **params)
+                    except asyncpg.UndefinedTableError as e:
+                        logger.warning("Skipped warming up a query: %s", e)
+
+        await asyncio.gather(
+            *(warm_up_connection() for _ in range(self.pool.get_min_size()))
+        )
+        logger.info(
+            "Warmed up %d database connections with %d statements in %.0f ms.",
+            self.pool.get_min_size(),
+            len(queries),
+            (time.perf_counter() - start) * 1000,
+        )
+
+    def _collect_pool_stats(self) -> List[str]:
+        if not botto.config["DATABASE_URI"]:
+            return []
+        pool = self.pool
+        return [
+            "# TYPE botto_db_pool_connections gauge",
+            f'botto_db_pool_connections{{state="open"}} {pool.get_size()}',
+            f'botto_db_pool_connections{{state="idle"}} {pool.get_idle_size()}',
+            f'botto_db_pool_connections{{state="max"}} {pool.get_max_size()}',
+            "# TYPE botto_db_pool_waiting gauge",
+            f"botto_db_pool_waiting {self.query_profiler.pool_waiting}",
+        ]
+
+    async def load_guild_prefixes(self) -> None:
+        """Load custom prefixes, creating their table if it does not exist yet.
+
+        Guilds use the PREFIXES of the config if the table cannot be read.
+        """
+        from .models.guild import GuildPrefixes
+
+        try:
+            await self.db.gino.create_all(tables=[GuildPrefixes.__table__])
+            rows = await GuildPrefixes.query.gino.all()
+        except asyncpg.PostgresError:
+            logger.exception("Could not load guild prefixes, using the defaults.")
+            rows = []
+        self.guild_prefixes = {row.guild_id: row.prefixes for row in rows}
+        self._prefix_matchers.clear()
+
+    def get_queries(self, template_name: str) -> Any:
         if not hasattr(self, "jinja_env"):
+            # Imported on first use, most modules do not use templated queries
+            import jinja2
+
             self.jinja_env = jinja2.Environment(
-                loader=jinja2.FileSystemLoader("botto/sql"), line_statement_prefix="-- :"
+                loader=jinja2.FileSystemLoader("botto/sql"),
+                line_statement_prefix="-- :",
             )
-
-    def get_queries(self, template_name: str) -> Any:
         return self.jinja_env.get_template(template_name).module
 
-    def run(self) -> None:
-        loop = self.loop
+    async def setup(self) -> None:
+        """Connect to the database and load the startup modules.
 
-        # Additional startup behaviour
+        Runs while the gateway connects. Commands and on_ready wait for it.
+        """
         dsn = botto.config["DATABASE_URI"]
-        loop.run_until_complete(self.db.set_bind(dsn))
+        database_start = time.perf_counter()
+
+        async def connect() -> None:
+            await self.connect_to_database(dsn)
+            await self.load_guild_prefixes()
+            self.startup_times["database"] = time.perf_counter() - database_start
+
+        # The pool opens its connections while the modules are imported
+        connecting = asyncio.ensure_future(connect()) if dsn else None
+        metrics_port = botto.config.get("METRICS_PORT")
+        if metrics_port:
+            # Each cluster serves its own metrics on the next port
+            await self.metrics.start_server(metrics_port + (self.cluster_id or 0))
+        if self.ipc is not None:
+            self.ipc.start()
+
+        modules_start = time.perf_counter()
+        modules: List[str] = botto.config["STARTUP_MODULES"]
+        for module in modules:
+            importlib.import_module(module)
+            # Let the gateway handshake and the pool through between imports
+            await asyncio.sleep(0)
+        # Modules may use the database as they are set up
+        if connecting is not None:
+            await connecting
+        for module in modules:
+            self.load_extension(module)
+        self.startup_times["modules"] = time.perf_counter() - modules_start
 
-        # if dsn:
-        #     loop.run_until_complete(self.connect_to_database(dsn))
+        if dsn:
+            warm_up_start = time.perf_counter()
+            await self.warm_up_pool()
+            self.startup_times["warm up"] = time.perf_counter() - warm_up_start
+        self.setup_complete.set()
 
-        for module in botto.config["STARTUP_MODULES"]:
-            self.load_extension(module)
+    def run(self) -> None:
+        loop = self.loop
+        self.loop_monitor.start()
+        # Time to start the interpreter and import the bot
+        self.startup_times["imports"] = time.time() - self.process.create_time()
+        self._run_started = time.perf_counter()
 
         # Default behaviour but calls self.shutdown instead of self.close
         try:
@@ -144,7 +396,7 @@ class Botto(commands.AutoShardedBot):
 
         async def runner() -> None:
             try:
-                await self.start(botto.config["TOKEN"])
+                await asyncio.gather(self.setup(), self.start(botto.config["TOKEN"]))
             finally:
                 await self.shutdown()
 
@@ -167,58 +419,222 @@ class Botto(commands.AutoShardedBot):
 
     async def shutdown(self) -> None:
         self.maintain_presence.cancel()  # pylint: disable=no-member
+        self.sampler.stop()
+        self.loop_monitor.stop()
+        self.sessions.close()
 
         for ext in tuple(self.extensions):
             self.unload_extension(ext)
 
-        await self.db.pop_bind().close()
-        logger.info("Gracefully closed Gino database connection.")
+        await self.metrics.stop_server()
+        if self.ipc is not None:
+            await self.ipc.close()
+
+        for executor in self.executors.values():
+            executor.shutdown(wait=False)
+
+        if botto.config["DATABASE_URI"]:
+            await self.db.pop_bind().close()
+            logger.info("Gracefully closed Gino database connection pool.")
         if not self.session.closed:
             await self.session.close()
             logger.info("Gracefully closed asynchronous HTTP client session.")
-        if hasattr(self, "pool") and not self.pool._closed:
-            await self.pool.close()
-            logger.info("Gracefully closed asynchronous database connection pool.")
         if not self.is_closed():
             logger.info("Closing client gracefully...")
             await self.close()
 
-    async def process_commands(self, message: discord.Message) -> None:
+    def load_extension(self, name: str) -> None:
+        super().load_extension(name)
+        self.invalidate_help_cache()
+
+    def unload_extension(self, name: str) -> None:
+        super().unload_extension(name)
+        self.invalidate_help_cache()
+
+    def reload_extension(self, name: str) -> None:
+        super().reload_extension(name)
+        self.invalidate_help_cache()
+
+    def invalidate_help_cache(self) -> None:
+        """Drop every cached help embed and parsed docstring.
+
+        Both are rebuilt lazily, when the help command or short_doc next need them.
+        """
+        self.help_cache.clear()
+        clear_docstring_cache()
+
+    # ------ Prefixes ------
+
+    def get_guild_prefixes(self, guild: Optional[discord.Guild]) -> List[str]:
+        """Return the custom prefixes of a guild or the configured prefixes."""
+        if guild is not None:
+            try:
+                return self.guild_prefixes[guild.id]
+            except KeyError:
+                pass
+        return botto.config["PREFIXES"]
+
+    async def set_guild_prefixes(self, guild_id: int, prefixes: List[str]) -> None:
+        """Set the custom prefixes of a guild, an empty list resets them."""
+        from .models.guild import GuildPrefixes
+
+        row = await GuildPrefixes.get(guild_id)
+        if not prefixes:
+            if row is not None:
+                await row.delete()
+            self.guild_prefixes.pop(guild_id, None)
+        elif row is None:
+            await GuildPrefixes.create(guild_id=guild_id, prefixes=prefixes)
+            self.guild_prefixes[guild_id] = prefixes
+        else:
+            await row.update(prefixes=prefixes).apply()
+            self.guild_prefixes[guild_id] = prefixes
+        self._prefix_matchers.pop(guild_id, None)
+
+    def get_prefix_matcher(self, guild: Optional[discord.Guild]) -> PrefixMatcher:
+        """Return the compiled prefix matcher of a guild, building it if needed."""
+        key = (
+            guild.id if guild is not None and guild.id in self.guild_prefixes else None
+        )
+        try:
+            return self._prefix_matchers[key]
+        except KeyError:
+            matcher = PrefixMatcher(
+                self.get_guild_prefixes(guild), user_id=self.user.id
+            )
+            self._prefix_matchers[key] = matcher
+            return matcher
+
+    async def get_prefix(self, message: discord.Message) -> List[str]:
+        return commands.when_mentioned_or(*self.get_guild_prefixes(message.guild))(
+            self, message
+        )
+
+    async def get_context(self, message: discord.Message, *, cls=Context) -> Context:
+        """Same as commands.Bot.get_context but matches prefixes with one regex."""
+        view = StringView(message.content)
+        ctx = cls(prefix=None, view=view, bot=self, message=message)
+
+        if self._skip_check(message.author.id, self.user.id):
+            return ctx
+
+        prefix = self.get_prefix_matcher(message.guild).match(message.content)
+        if prefix is None:
+            return ctx
+
+        view.skip_string(prefix)
+        invoker = view.get_word()
+        ctx.invoked_with = invoker
+        ctx.prefix = prefix
+        ctx.command = self.all_commands.get(invoker)
+        return ctx
+
+    # ------ Command processing ------
+
+    def filter_message(self, message: discord.Message) -> Optional[str]:
+        """Return why a message cannot invoke a command, or None if it might.
+
+        Only cheap lookups are done here, before any context is created.
+        Interactive sessions receive messages through wait_for, which does not go
+        through command processing, so they are not affected by this.
+        """
         if message.author.bot:
+            return "bot"
+        content = message.content
+        if not content:
+            return "empty"
+        if content[0] not in self.get_prefix_matcher(message.guild).first_chars:
+            return "no_prefix"
+        if self.sessions.is_locked(message.author.id, message.channel.id):
+            return "locked"
+        return None
+
+    async def process_commands(self, message: discord.Message) -> None:
+        received: float = time.perf_counter()
+        if not self.setup_complete.is_set():
+            await self.setup_complete.wait()
+        reason = self.filter_message(message)
+        if reason is not None:
+            self.message_stats[reason] += 1
             return
+        self.message_stats["processed"] += 1
         ctx: Context = await self.get_context(message, cls=Context)
-        if ctx.is_locked():
-            return
+        ctx.received_at = received
         await self.invoke(ctx)
 
-    # ------ Checks and invocation hooks ------
+    async def invoke(self, ctx: Context) -> None:
+        """Invoke the command with its latency and outcome recorded in metrics."""
+        if ctx.command is None:
+            await super().invoke(ctx)
+            return
 
-    async def _check_fundamental_permissions(self, ctx: Context) -> bool:
-        # read_messages is an implicit requirement.
-        # This check wouldn't run if it didn't read a command message. (duh)
-        required_perms = discord.Permissions()
-        required_perms.update(
-            send_messages=True,
-            embed_links=True,
-            attach_files=True,
-            read_message_history=True,
-            external_emojis=True,
-            add_reactions=True,
+        queued: float = time.perf_counter() - getattr(
+            ctx, "received_at", time.perf_counter()
         )
+        invocation, token = self.metrics.start(ctx.command.qualified_name, queued)
+        try:
+            await super().invoke(ctx)
+        finally:
+            # Command errors are handled by dispatch_error, which flags the context
+            self.metrics.finish(invocation, token, failed=ctx.command_failed)
+
+    def _report_stall(self, stall: Stall) -> None:
+        last_report = self._stall_reports.get(stall.location)
+        now = self.loop.time()
+        interval = botto.config.get("STALL_REPORT_INTERVAL", 600)
+        if not self.is_ready() or (
+            last_report is not None and now - last_report < interval
+        ):
+            return
+        self._stall_reports[stall.location] = now
+        content = (
+            f"Event loop blocked for {stall.duration * 1000:.0f} ms at "
+            f"`{stall.location}`.\n```py\n{stall.stack[-1800:]}```"
+        )
+        self.loop.create_task(self.send_console(content))
 
-        actual_perms = ctx.channel.permissions_for(ctx.me)
+    # ------ Executors ------
 
-        missing: List[str] = [
-            perm
-            for perm, value in required_perms
-            if value is True and getattr(actual_perms, perm) is not True
-        ]
+    async def run_in_executor(
+        self, func: Callable, *args: Any, executor: str = "io", **kwargs: Any
+    ) -> Any:
+        """Run a function in the "cpu" process pool or the "io" thread pool.
+
+        Functions run in the process pool and their arguments must be picklable.
+        """
+        return await self.executors[executor].run(self.loop, func, *args, **kwargs)
+
+    def _collect_executor_stats(self) -> List[str]:
+        return collect_executors(self.executors.values())
+
+    def _collect_message_stats(self) -> List[str]:
+        lines: List[str] = ["# TYPE botto_messages_total counter"]
+        for reason, count in self.message_stats.items():
+            lines.append(f'botto_messages_total{{result="{reason}"}} {count}')
+        return lines
+
+    # ------ Checks and invocation hooks ------
 
-        if not missing:
+    async def _check_fundamental_permissions(self, ctx: Context) -> bool:
+        try:
+            missing_bits = self._missing_permissions[ctx.channel.id]
+        except KeyError:
+            actual_perms = ctx.channel.permissions_for(ctx.me)
+            missing_bits = FUNDAMENTAL_PERMISSIONS & ~actual_perms.value
+            self._missing_permissions[ctx.channel.id] = missing_bits
+
+        if not missing_bits:
             return True
 
+        missing: List[str] = [
+            perm for perm, value in discord.Permissions(missing_bits) if value
+        ]
         raise BotMissingFundamentalPermissions(missing)
 
+    def clear_permissions_cache(self, guild: discord.Guild) -> None:
+        for channel in guild.channels:
+            self._missing_permissions.pop(channel.id, None)
+
     async def unlock_after_invoke(self, ctx: Context) -> None:
         """Post invocation hook to unlock context."""
         ctx.unlock()
@@ -242,17 +658,63 @@ class Botto(commands.AutoShardedBot):
     # ------ Event listeners ------
 
     async def on_ready(self) -> None:
+        await self.setup_complete.wait()
+        if self.ready_time is None:
+            self.startup_times["ready"] = time.perf_counter() - self._run_started
         self.ready_time = datetime.datetime.utcnow()
+        if self.ipc is not None:
+            self.ipc.send_ready()
         logger.info("Bot has connected.")
         try:
             embed: Optional[discord.Embed] = self.cogs["Meta"].get_statistics_embed()
         except KeyError:
             embed = None
             logger.warning("Meta cog was not found, statistics embed will not be sent.")
-        except psutil.AccessDenied:
-            embed = None
-            logger.exception("psutil lacks permissions to check system information.")
-        await self.send_console("Bot has connected.", embed=embed)
+        stats = cache.cache_statistics(self)
+        name = "Bot" if self.cluster_id is None else f"Cluster {self.cluster_id}"
+        imports = self.startup_times["imports"]
+        connecting = self.startup_times["ready"]
+        # Set up while connecting, so these overlap with the time to connect
+        setup = ", ".join(
+            f"{phase} {seconds:.1f} s"
+            for phase, seconds in self.startup_times.items()
+            if phase not in ("imports", "ready")
+        )
+        content = (
+            f"{name} has connected. Caching {stats['members_cached']} of "
+            f"{stats['members_total']} members, "
+            f"~{stats['saved_bytes'] / 2 ** 20:.1f} MiB saved.\n"
+            f"Ready in {imports + connecting:.1f} s: imports {imports:.1f} s, "
+            f"then {connecting:.1f} s to connect"
+            + (f" while setting up ({setup})." if setup else ".")
+        )
+        logger.info(content)
+        await self.send_console(content, embed=embed)
+
+    async def on_guild_channel_update(
+        self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel
+    ) -> None:
+        self._missing_permissions.pop(after.id, None)
+
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel) -> None:
+        self._missing_permissions.pop(channel.id, None)
+
+    async def on_guild_role_update(
+        self, before: discord.Role, after: discord.Role
+    ) -> None:
+        self.clear_permissions_cache(after.guild)
+
+    async def on_guild_role_delete(self, role: discord.Role) -> None:
+        self.clear_permissions_cache(role.guild)
+
+    async def on_member_update(
+        self, before: discord.Member, after: discord.Member
+    ) -> None:
+        if after.id == self.user.id:
+            self.clear_permissions_cache(after.guild)
+
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        self.clear_permissions_cache(guild)
 
     async def on_error(self, event_method: str, *args: Any, **kwargs: Any) -> None:
         logger.exception("Unhandled exception in '%s' event handler.", event_method)
@@ -0,0 +1,136 @@
+import sys
+from typing import Any, Dict, Iterable, Optional, Set
+
+import discord
+from discord.state import ConnectionState
+
+# Settings of a cache profile:
+#   intents: names of the gateway intents to enable, or "all". "default" stands
+#     for every intent except the privileged members and presences intents
+#   members: names of the MemberCacheFlags to enable, or "all" or "none"
+#   max_messages: size of the message cache, None to disable it
+#   chunk_guilds: whether to request every guild's members at startup
+PROFILES: Dict[str, Dict[str, Any]] = {
+    # Caches everything the default intents receive. The privileged intents must
+    # be enabled for the bot in the developer portal first, then opted into with
+    # CACHE_OVERRIDES: {intents: [default, members, presences]}
+    "full": {
+        "intents": ["default"],
+        "members": "all",
+        "max_messages": 1000,
+        "chunk_guilds": True,
+    },
+    # Only what commands need: message content, reactions for paginators, and
+    # guilds, channels and roles for permission checks
+    "low_memory": {
+        "intents": [
+            "guilds",
+            "guild_messages",
+            "dm_messages",
+            "guild_reactions",
+            "dm_reactions",
+        ],
+        "members": "none",
+        "max_messages": None,
+        "chunk_guilds": False,
+    },
+}
+
+
+def make_intents(names: Any) -> discord.Intents:
+    if names == "all":
+        return discord.Intents.all()
+    if "default" in names:
+        intents = discord.Intents.default()
+    else:
+        intents = discord.Intents.none()
+    for name in names:
+        if name != "default":
+            setattr(intents, name, True)
+    return intents
+
+
+def make_member_cache_flags(
+    names: Any, intents: discord.Intents
+) -> discord.MemberCacheFlags:
+    if names == "all":
+        # Flags which need a disabled intent would be rejected
+        return discord.MemberCacheFlags.from_intents(intents)
+    flags = discord.MemberCacheFlags.none()
+    if names != "none":
+        for name in names:
+            setattr(flags, name, True)
+    return flags
+
+
+def client_options(
+    profile: str = "full", overrides: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Return client keyword arguments of a cache profile, see PROFILES."""
+    try:
+        settings = {**PROFILES[profile], **(overrides or {})}
+    except KeyError:
+        raise ValueError(
+            f"Unknown CACHE_PROFILE {profile!r}, expected one of {', '.join(PROFILES)}."
+        ) from None
+    intents = make_intents(settings["intents"])
+    return {
+        "intents": intents,
+        "member_cache_flags": make_member_cache_flags(settings["members"], intents),
+        "max_messages": settings["max_messages"],
+        "chunk_guilds_at_startup": settings["chunk_guilds"] and intents.members,
+    }
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None, depth: int = 4) -> int:
+    """Approximate bytes of an object and what it holds.
+
+    The client, state and guilds are shared by every cached object and skipped.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(
+        obj, (discord.Client, discord.Guild, ConnectionState)
+    ):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if depth <= 0 or isinstance(obj, (str, bytes, int, float)):
+        return size
+    children: Iterable[Any] = ()
+    if isinstance(obj, dict):
+        children = [*obj.keys(), *obj.values()]
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        children = obj
+    else:
+        slots = [
+            name
+            for cls in type(obj).__mro__
+            for name in getattr(cls, "__slots__", ())
+            if hasattr(obj, name)
+        ]
+        children = [getattr(obj, name) for name in slots]
+        if hasattr(obj, "__dict__"):
+            children = [*children, obj.__dict__]
+    return size + sum(deep_sizeof(child, seen, depth - 1) for child in children)
+
+
+def cache_statistics(bot: discord.Client) -> Dict[str, int]:
+    """Return counts of cached objects and the bytes saved by uncached members.
+
+    Must be called from the event loop, which updates the caches.
+    """
+    members_total = sum(guild.member_count or 0 for guild in bot.guilds)
+    members_cached = sum(len(guild.members) for guild in bot.guilds)
+    # Every guild caches the bot's own member, which stands for an average member
+    sample = bot.guilds[0].me if bot.guilds else None
+    member_size = deep_sizeof(sample) if sample is not None else 0
+    return {
+        "guilds": len(bot.guilds),
+        "members_total": members_total,
+        "members_cached": members_cached,
+        "users_cached": len(bot.users),
+        "messages_cached": len(bot.cached_messages),
+        "member_size": member_size,
+        "saved_bytes": max(0, members_total - members_cached) * member_size,
+    }
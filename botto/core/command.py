@@ -1,12 +1,34 @@
 import asyncio
 import functools
 import inspect
+from typing import Any, Dict
 
 import discord
 import yaml
 from discord.ext import commands
 from discord.ext.commands.core import hooked_wrapped_callback
 
+# Parsed YAML docstrings by their text. Docstrings are parsed the first time the
+# help command or short_doc needs them, not when their extension is loaded, so
+# startup parses nothing. Cleared when extensions are (un)loaded.
+_docstring_cache: Dict[str, Any] = {}
+
+
+def load_docstring(docstring: str) -> Any:
+    """Parse a YAML docstring, returning the cached result if it was parsed before.
+
+    The result is shared between calls and must be copied before being modified.
+    """
+    try:
+        return _docstring_cache[docstring]
+    except KeyError:
+        items = _docstring_cache[docstring] = yaml.full_load(docstring)
+        return items
+
+
+def clear_docstring_cache() -> None:
+    _docstring_cache.clear()
+
 
 class Command(commands.Command):
     def help_embed(self, coro):
@@ -24,7 +46,7 @@ class Command(commands.Command):
         if self.brief is not None:
             return self.brief
         if self.help is not None:
-            items = yaml.full_load(self.help)
+            items = load_docstring(self.help)
             if isinstance(items, dict):
                 return items.get("short", "Information not available.")
             return self.help.split("\n", 1)[0]
@@ -3,9 +3,11 @@ from typing import Any, Callable, Coroutine, Dict, Optional, Tuple, Union
 
 import aiohttp
 
+import discord
 from discord.ext import commands
 
 import botto
+from .metrics import timed
 
 try:
     import ujson as json
@@ -15,31 +17,46 @@ except ImportError:
 
 class Context(commands.Context):
 
-    locked_authors: Dict[int, "Context"] = {}
+    # perf_counter value of when the message was received by command processing
+    received_at: float
 
     @property
     def session(self) -> aiohttp.ClientSession:
         return self.bot.session
 
+    async def send(self, *args: Any, **kwargs: Any) -> discord.Message:
+        with timed("send"):
+            return await super().send(*args, **kwargs)
+
     # ------ General and simple methods ------
 
-    async def run_in_exec(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
-        partial: functools.partial[Any] = functools.partial(func, *args, **kwargs)
-        return await self.bot.loop.run_in_executor(None, partial)
+    async def run_in_exec(
+        self, func: Callable, *args: Any, executor: str = "io", **kwargs: Any
+    ) -> Any:
+        """Run a function in the "io" or "cpu" executor of the bot."""
+        return await self.bot.run_in_executor(func, *args, executor=executor, **kwargs)
 
     # ------ Context locking ------
 
     def lock(self) -> None:
-        """Lock the author from using other commands."""
-        self.locked_authors[self.author.id] = self
+        """Lock the author from using other commands in the channel.
+
+        This ends any other session of the author in the channel. The lock expires
+        after SESSION_TIMEOUT seconds if it is never unlocked.
+        """
+        self.bot.sessions.start(
+            self.author.id, self.channel.id, self.command.qualified_name, locks=True
+        )
 
     def unlock(self) -> None:
-        """Unlock the author from using other commands."""
-        self.locked_authors.pop(self.author.id, None)
+        """Unlock the author from using other commands in the channel."""
+        session = self.bot.sessions.get(self.author.id, self.channel.id)
+        if session is not None and session.locks:
+            self.bot.sessions.end_session(session)
 
     def is_locked(self) -> bool:
-        """Check if the author is locked from using other commands."""
-        return self.author.id in self.locked_authors
+        """Check if the author is locked from using other commands in the channel."""
+        return self.bot.sessions.is_locked(self.author.id, self.channel.id)
 
     # ------ Paste posting shortcuts ------
 
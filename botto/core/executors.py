@@ -0,0 +1,100 @@
+import asyncio
+import concurrent.futures
+import functools
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class TrackedExecutor:
+    """An executor which keeps count of the work submitted through it.
+
+    Parameters
+    ------------
+    name: str
+        Name of the executor in metrics.
+    factory: Callable[[], concurrent.futures.Executor]
+        Creates the executor to run work in, called when work is first submitted.
+    max_workers: int
+        Number of workers of the executor, work above it is queued.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], concurrent.futures.Executor],
+        max_workers: int,
+    ) -> None:
+        self.name: str = name
+        self.factory = factory
+        self.max_workers: int = max_workers
+        # Work submitted and not done yet, running or queued
+        self.pending: int = 0
+        self.completed: int = 0
+        # Seconds from submission to completion, summed over completed work
+        self.busy: float = 0.0
+        self._executor: Optional[concurrent.futures.Executor] = None
+
+    @property
+    def executor(self) -> concurrent.futures.Executor:
+        if self._executor is None:
+            self._executor = self.factory()
+        return self._executor
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.pending - self.max_workers)
+
+    async def run(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        func: Callable,
+        *args: Any,
+        **kwargs: Any,
+    ) -> Any:
+        partial = functools.partial(func, *args, **kwargs)
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self.executor, partial)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+            self.busy += time.perf_counter() - start
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def values(self) -> Dict[str, float]:
+        """Return metric names without the botto_executor_ prefix to values."""
+        return {
+            "workers": self.max_workers,
+            "pending": self.pending,
+            "queued": self.queued,
+            "completed_total": self.completed,
+            "busy_seconds_total": round(self.busy, 6),
+        }
+
+
+# Types of the metrics of TrackedExecutor.values
+METRIC_TYPES: Dict[str, str] = {
+    "workers": "gauge",
+    "pending": "gauge",
+    "queued": "gauge",
+    "completed_total": "counter",
+    "busy_seconds_total": "counter",
+}
+
+
+def collect_executors(executors: Iterable[TrackedExecutor]) -> List[str]:
+    """Prometheus lines of the executors, grouped by metric as the format requires."""
+    values = {executor.name: executor.values() for executor in executors}
+    lines: List[str] = []
+    for metric, metric_type in METRIC_TYPES.items():
+        lines.append(f"# TYPE botto_executor_{metric} {metric_type}")
+        for name, executor_values in values.items():
+            lines.append(
+                f'botto_executor_{metric}{{executor="{name}"}} {executor_values[metric]}'
+            )
+    return lines
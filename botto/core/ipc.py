@@ -0,0 +1,206 @@
+"""Communication between cluster workers and the launcher, see botto/cluster.py.
+
+Messages are JSON objects, one per line, over a TCP connection to the launcher
+on localhost. Each message has an "op":
+
+    identify   worker -> launcher  {"cluster_id", "token"}, sent first
+    ready      worker -> launcher  the worker's shards are connected
+    request    worker -> launcher  {"nonce", "action", "args"}
+    reply      launcher -> worker  {"nonce", "data"} or {"nonce", "error"}
+    command    launcher -> worker  {"nonce", "action", "args"}
+    result     worker -> launcher  {"nonce", "data"} or {"nonce", "error"}
+
+Requests are answered by the launcher, which broadcasts most of them to every
+worker as commands and replies with the results keyed by cluster ID.
+"""
+
+import asyncio
+import inspect
+import itertools
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+logger = logging.getLogger("botto.ipc")
+
+# Stats of a whole cluster fit in far less, but the default limit is 64 KiB
+LINE_LIMIT = 2 ** 20
+
+Handler = Callable[..., Union[Any, Awaitable[Any]]]
+
+
+class IPCError(Exception):
+    """A request could not be sent or was answered with an error."""
+
+
+async def read_message(reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+    """Read the next message, or None once the connection is closed."""
+    line = await reader.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def write_message(writer: asyncio.StreamWriter, message: Dict[str, Any]) -> None:
+    writer.write(json.dumps(message, separators=(",", ":")).encode() + b"\n")
+
+
+async def run_handler(handler: Handler, args: Dict[str, Any]) -> Dict[str, Any]:
+    """Call a command handler and return the data or error of its result."""
+    try:
+        data = handler(**args)
+        if inspect.isawaitable(data):
+            data = await data
+    except Exception as e:  # pylint: disable=broad-except
+        return {"error": f"{type(e).__name__}: {e}"}
+    return {"data": data}
+
+
+class IPCClient:
+    """Connection of a cluster worker to the launcher.
+
+    The connection is made in the background and made again if it is lost.
+
+    Parameters
+    ------------
+    cluster_id: int
+        ID of the cluster the worker runs.
+    port: int
+        Port the launcher listens on, on localhost.
+    token: str
+        Secret of the launcher, passed to workers so no one else can connect.
+    """
+
+    def __init__(
+        self,
+        cluster_id: int,
+        port: int,
+        token: str,
+        *,
+        host: str = "127.0.0.1",
+        retry_interval: float = 5.0,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> None:
+        self.cluster_id: int = cluster_id
+        self.host: str = host
+        self.port: int = port
+        self.token: str = token
+        self.retry_interval: float = retry_interval
+        self.loop = loop or asyncio.get_event_loop()
+        # Action to the function running commands of it, called with the args
+        self.handlers: Dict[str, Handler] = {}
+        self.is_ready: bool = False
+        self._nonces = itertools.count()
+        self._replies: Dict[str, asyncio.Future] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = self.loop.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(
+                    self.host, self.port, limit=LINE_LIMIT
+                )
+            except OSError as e:
+                logger.warning("Could not connect to the launcher: %s", e)
+                await asyncio.sleep(self.retry_interval)
+                continue
+            write_message(
+                writer,
+                {"op": "identify", "cluster_id": self.cluster_id, "token": self.token},
+            )
+            if self.is_ready:
+                write_message(writer, {"op": "ready"})
+            self._writer = writer
+            logger.info("Connected to the launcher as cluster %d.", self.cluster_id)
+            try:
+                await self._read(reader)
+            except (OSError, ValueError) as e:
+                logger.warning("Lost connection to the launcher: %s", e)
+            finally:
+                self._writer = None
+                writer.close()
+                for future in self._replies.values():
+                    if not future.done():
+                        future.set_exception(IPCError("Lost connection to launcher."))
+                self._replies.clear()
+            await asyncio.sleep(self.retry_interval)
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            message = await read_message(reader)
+            if message is None:
+                return
+            op = message.get("op")
+            if op == "reply":
+                future = self._replies.pop(message["nonce"], None)
+                if future is None or future.done():
+                    continue
+                if "error" in message:
+                    future.set_exception(IPCError(message["error"]))
+                else:
+                    future.set_result(message.get("data"))
+            elif op == "command":
+                self.loop.create_task(self._run_command(message))
+
+    async def _run_command(self, message: Dict[str, Any]) -> None:
+        handler = self.handlers.get(message["action"])
+        if handler is None:
+            result = {"error": f"Unknown action {message['action']!r}."}
+        else:
+            result = await run_handler(handler, message.get("args") or {})
+        if self._writer is not None:
+            write_message(
+                self._writer, {"op": "result", "nonce": message["nonce"], **result}
+            )
+
+    def send_ready(self) -> None:
+        """Tell the launcher that the shards are connected, so it starts the next."""
+        self.is_ready = True
+        if self._writer is not None:
+            write_message(self._writer, {"op": "ready"})
+
+    def _send_request(self, action: str, args: Dict[str, Any]) -> str:
+        if self._writer is None:
+            raise IPCError("Not connected to the launcher.")
+        nonce = f"{self.cluster_id}-{next(self._nonces)}"
+        write_message(
+            self._writer,
+            {"op": "request", "nonce": nonce, "action": action, "args": args},
+        )
+        return nonce
+
+    def notify(self, action: str, **args: Any) -> None:
+        """Send a request to the launcher without waiting for its reply.
+
+        For requests the launcher may not answer, like shutdown, which stops this
+        worker. Raises IPCError if not connected.
+        """
+        self._send_request(action, args)
+
+    async def request(self, action: str, *, timeout: float = 30.0, **args: Any) -> Any:
+        """Send a request to the launcher and return the data of its reply.
+
+        Raises IPCError if not connected, on timeout or if the reply is an error.
+        """
+        nonce = self._send_request(action, args)
+        future = self.loop.create_future()
+        self._replies[nonce] = future
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise IPCError(f"The launcher did not reply to {action!r}.") from None
+        finally:
+            self._replies.pop(nonce, None)
@@ -0,0 +1,199 @@
+import asyncio
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("botto.loopmonitor")
+
+PACKAGE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Stall:
+    """A callback which blocked the event loop for longer than the threshold."""
+
+    __slots__ = ("last_beat", "duration", "location", "stack")
+
+    def __init__(self, last_beat: float, location: str, stack: str) -> None:
+        # Monotonic time of the heartbeat before the stall
+        self.last_beat: float = last_beat
+        self.duration: float = 0.0
+        self.location: str = location
+        self.stack: str = stack
+
+
+class Offender:
+    """Totals of the stalls with the same location."""
+
+    __slots__ = ("count", "total", "max", "last")
+
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+        self.last: Optional[Stall] = None
+
+
+def describe_stack(frame) -> Tuple[str, str]:
+    """Return the location of the deepest botto frame of a stack and its text."""
+    summary = traceback.extract_stack(frame)
+    location = summary[-1]
+    for entry in reversed(summary):
+        if entry.filename.startswith(PACKAGE_PATH):
+            location = entry
+            break
+    where = f"{os.path.relpath(location.filename)}:{location.lineno} in {location.name}"
+    return where, "".join(traceback.format_list(summary[-12:]))
+
+
+class LoopMonitor:
+    """Measure event loop lag and capture the stack of callbacks that block it.
+
+    A heartbeat callback is scheduled on the loop every interval. A watchdog
+    thread checks the heartbeat and, if it is late by more than the threshold,
+    captures the stack of the loop thread while the offending callback is still
+    running. Unlike asyncio's debug mode, nothing is wrapped around callbacks,
+    so it can stay enabled in production.
+
+    Parameters
+    ------------
+    interval: float
+        Seconds between heartbeats.
+    threshold: float
+        Seconds a heartbeat may be late before the loop is considered stalled.
+    on_stall: Optional[Callable[[Stall], None]]
+        Called on the loop with every stall once it is over.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = 0.1,
+        threshold: float = 0.25,
+        on_stall: Optional[Callable[[Stall], None]] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> None:
+        self.interval: float = interval
+        self.threshold: float = threshold
+        self.on_stall = on_stall
+        self.loop = loop or asyncio.get_event_loop()
+        self.offenders: Dict[str, Offender] = {}
+        self.recent: Deque[Stall] = collections.deque(maxlen=50)
+        self.lag: float = 0.0
+        self.stalls: int = 0
+        self.stalled_time: float = 0.0
+        self._max_lag: float = 0.0
+        self._expected: float = 0.0
+        self._last_beat: float = 0.0
+        self._stall: Optional[Stall] = None
+        self._handle: Optional[asyncio.Handle] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start monitoring, must be called from the thread running the loop."""
+        if self._thread is not None:
+            return
+        loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._expected = self._last_beat + self.interval
+        self._handle = self.loop.call_later(self.interval, self._beat)
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._watch,
+            args=(loop_thread_id,),
+            name="botto-loop-monitor",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._stopped.set()
+        self._thread = None
+
+    def pop_max_lag(self) -> float:
+        """Return the highest lag since the last call and reset it."""
+        max_lag, self._max_lag = self._max_lag, 0.0
+        return max_lag
+
+    def _beat(self) -> None:
+        now = time.monotonic()
+        previous_beat = self._last_beat
+        self.lag = max(0.0, now - self._expected)
+        self._max_lag = max(self._max_lag, self.lag)
+        self._last_beat = now
+        self._expected = now + self.interval
+        self._handle = self.loop.call_later(self.interval, self._beat)
+
+        stall, self._stall = self._stall, None
+        # A stack captured right as the previous beat ran belongs to no stall
+        if stall is not None and stall.last_beat == previous_beat:
+            stall.duration = now - previous_beat - self.interval
+            self._record(stall)
+
+    def _record(self, stall: Stall) -> None:
+        self.stalls += 1
+        self.stalled_time += stall.duration
+        self.recent.append(stall)
+        try:
+            offender = self.offenders[stall.location]
+        except KeyError:
+            offender = self.offenders[stall.location] = Offender()
+        offender.count += 1
+        offender.total += stall.duration
+        offender.max = max(offender.max, stall.duration)
+        offender.last = stall
+        logger.warning(
+            "Event loop blocked for %.0f ms at %s.",
+            stall.duration * 1000,
+            stall.location,
+        )
+        if self.on_stall is not None:
+            self.on_stall(stall)
+
+    def _watch(self, loop_thread_id: int) -> None:
+        while not self._stopped.wait(self.interval):
+            last_beat = self._last_beat
+            late = time.monotonic() - last_beat - self.interval
+            if late < self.threshold or self._stall is not None:
+                continue
+            frame = sys._current_frames().get(  # pylint: disable=protected-access
+                loop_thread_id
+            )
+            if frame is None:
+                continue
+            location, stack = describe_stack(frame)
+            del frame
+            # Only the first capture of a stall is kept, the next beat ends it
+            self._stall = Stall(last_beat, location, stack)
+
+    def top(self, count: int = 10) -> List[Tuple[str, Offender]]:
+        """Return (location, offender) pairs with the most stalled time."""
+        return sorted(
+            self.offenders.items(), key=lambda item: item[1].total, reverse=True
+        )[:count]
+
+    def collect(self) -> List[str]:
+        lines: List[str] = [
+            "# TYPE botto_event_loop_heartbeat_lag_seconds gauge",
+            f"botto_event_loop_heartbeat_lag_seconds {self.lag:.6f}",
+            "# TYPE botto_event_loop_stalls_total counter",
+            f"botto_event_loop_stalls_total {self.stalls}",
+            "# TYPE botto_event_loop_stalled_seconds_total counter",
+            f"botto_event_loop_stalled_seconds_total {self.stalled_time:.6f}",
+            "# TYPE botto_event_loop_offender_seconds_total counter",
+        ]
+        for location, offender in self.top():
+            label = location.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(
+                f'botto_event_loop_offender_seconds_total{{location="{label}"}} '
+                f"{offender.total:.6f}"
+            )
+        return lines
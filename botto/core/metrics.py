@@ -0,0 +1,184 @@
+import collections
+import contextvars
+import time
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+
+# Phases of a command invocation that are timed separately
+PHASES: Tuple[str, ...] = ("total", "queue", "db", "http", "send")
+QUANTILES: Tuple[float, ...] = (0.5, 0.9, 0.99)
+
+
+class Invocation:
+    """Timings of a command invocation in progress."""
+
+    __slots__ = ("command", "start", "times")
+
+    def __init__(self, command: str, queued: float) -> None:
+        self.command: str = command
+        self.start: float = time.perf_counter()
+        self.times: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.times["queue"] = queued
+
+
+current_invocation: "contextvars.ContextVar[Optional[Invocation]]" = (
+    contextvars.ContextVar("current_invocation", default=None)
+)
+
+
+def add_time(phase: str, seconds: float) -> None:
+    """Add time spent in a phase to the invocation of the current task, if any."""
+    invocation = current_invocation.get()
+    if invocation is not None:
+        invocation.times[phase] += seconds
+
+
+class timed:  # pylint: disable=invalid-name
+    """Context manager adding the time spent in its body to a phase."""
+
+    __slots__ = ("phase", "start")
+
+    def __init__(self, phase: str) -> None:
+        self.phase: str = phase
+        self.start: float = 0.0
+
+    def __enter__(self) -> "timed":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        add_time(self.phase, time.perf_counter() - self.start)
+
+
+def percentile(values: List[float], quantile: float) -> float:
+    """Return a quantile of sorted values, 0.0 if there are none."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(quantile * len(values)))]
+
+
+class CommandMetrics:
+    """Invocation and error counts of a command, with recent latency samples."""
+
+    __slots__ = ("invocations", "errors", "samples")
+
+    def __init__(self, size: int) -> None:
+        self.invocations: int = 0
+        self.errors: int = 0
+        self.samples: Dict[str, Deque[float]] = {
+            phase: collections.deque(maxlen=size) for phase in PHASES
+        }
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.invocations if self.invocations else 0.0
+
+    def quantiles(self, phase: str) -> List[float]:
+        values = sorted(self.samples[phase])
+        return [percentile(values, quantile) for quantile in QUANTILES]
+
+
+class Metrics:
+    """In-memory command metrics, with a Prometheus text endpoint.
+
+    Parameters
+    ------------
+    size: int
+        Number of latency samples kept per command and phase.
+    """
+
+    def __init__(self, size: int = 1024) -> None:
+        self.size: int = size
+        self.commands: Dict[str, CommandMetrics] = {}
+        # Functions returning extra lines of Prometheus text exposition
+        self.collectors: List[Callable[[], Iterable[str]]] = []
+        self._runner: Optional[web.AppRunner] = None
+
+    def start(
+        self, command: str, queued: float
+    ) -> Tuple[Invocation, contextvars.Token]:
+        invocation = Invocation(command, queued)
+        return (invocation, current_invocation.set(invocation))
+
+    def finish(
+        self, invocation: Invocation, token: contextvars.Token, *, failed: bool
+    ) -> None:
+        current_invocation.reset(token)
+        invocation.times["total"] = time.perf_counter() - invocation.start
+        try:
+            metrics = self.commands[invocation.command]
+        except KeyError:
+            metrics = self.commands[invocation.command] = CommandMetrics(self.size)
+        metrics.invocations += 1
+        metrics.errors += failed
+        for phase, seconds in invocation.times.items():
+            metrics.samples[phase].append(seconds)
+
+    def http_trace_config(self) -> aiohttp.TraceConfig:
+        """Trace config adding aiohttp client request times to the http phase."""
+
+        async def on_request_start(session, trace_config_ctx, params) -> None:
+            trace_config_ctx.start = time.perf_counter()
+
+        async def on_request_end(session, trace_config_ctx, params) -> None:
+            add_time("http", time.perf_counter() - trace_config_ctx.start)
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_end)
+        return trace_config
+
+    # ------ Prometheus exposition ------
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = [
+            "# TYPE botto_command_invocations_total counter",
+            "# TYPE botto_command_errors_total counter",
+            "# TYPE botto_command_latency_seconds summary",
+        ]
+        for name, metrics in sorted(self.commands.items()):
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(
+                f'botto_command_invocations_total{{command="{label}"}} '
+                f"{metrics.invocations}"
+            )
+            lines.append(
+                f'botto_command_errors_total{{command="{label}"}} {metrics.errors}'
+            )
+            for phase in PHASES:
+                labels = f'command="{label}",phase="{phase}"'
+                for quantile, value in zip(QUANTILES, metrics.quantiles(phase)):
+                    lines.append(
+                        f"botto_command_latency_seconds"
+                        f'{{{labels},quantile="{quantile}"}} {value:.6f}'
+                    )
+                samples = metrics.samples[phase]
+                lines.append(
+                    f"botto_command_latency_seconds_sum{{{labels}}} {sum(samples):.6f}"
+                )
+                lines.append(
+                    f"botto_command_latency_seconds_count{{{labels}}} {len(samples)}"
+                )
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+    async def start_server(self, port: int, host: str = "127.0.0.1") -> None:
+        """Serve the metrics in Prometheus text format on /metrics."""
+
+        async def handler(request: web.Request) -> web.Response:
+            return web.Response(text=self.render_prometheus())
+
+        app = web.Application()
+        app.router.add_get("/metrics", handler)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def stop_server(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,18 @@
+from botto.core.bot import Botto
+
+db = Botto.db
+
+# pylint: disable=no-member
+
+
+class GuildPrefixes(db.Model):  # type: ignore
+    __tablename__ = "Botto_GuildPrefixes"
+
+    guild_id = db.Column(db.BigInteger, primary_key=True)
+    prefixes = db.Column(db.ARRAY(db.String), nullable=False)
+
+    def __repr__(self) -> str:
+        return (
+            "<Botto_GuildPrefixes guild_id={0.guild_id} "
+            "prefixes={0.prefixes!r}>".format(self)
+        )
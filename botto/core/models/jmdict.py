@@ -5,6 +5,11 @@ db = Botto.db
 # pylint: disable=no-member
 
 
+def gloss_tsvector(column):
+    """Full-text search vector of a gloss column, matching its GIN index."""
+    return db.func.to_tsvector(db.literal_column("'english'::regconfig"), column)
+
+
 class Entry(db.Model):  # type: ignore  # <entry>
     __tablename__ = "JMdict_Entry"
 
@@ -22,6 +27,15 @@ class WritingElement(db.Model):  # type: ignore  # <k_ele>
     priority = db.Column(db.ARRAY(db.String), nullable=False)  # <ke_pri>
     info = db.Column(db.ARRAY(db.String), nullable=False)  # <ke_inf>
 
+    __table_args__ = (
+        # text_pattern_ops lets LIKE 'prefix%' lookups use the index
+        db.Index(
+            "ix_JMdict_WritingElement_literal_pattern",
+            literal,
+            postgresql_ops={"literal": "text_pattern_ops"},
+        ),
+    )
+
     def __repr__(self) -> str:
         return (
             "<JMdict_WritingElement entry_id={0.entry_id} "
@@ -37,6 +51,14 @@ class ReadingElement(db.Model):  # type: ignore  # <r_ele>
     priority = db.Column(db.ARRAY(db.String), nullable=False)  # <re_pri>
     info = db.Column(db.ARRAY(db.String), nullable=False)  # <re_inf>
 
+    __table_args__ = (
+        db.Index(
+            "ix_JMdict_ReadingElement_literal_pattern",
+            literal,
+            postgresql_ops={"literal": "text_pattern_ops"},
+        ),
+    )
+
     def __repr__(self) -> str:
         return (
             "<JMdict_ReadingElement entry_id={0.entry_id} "
@@ -73,6 +95,9 @@ class Gloss(db.Model):  # type: ignore  # <gloss> (within <sense>)
 
     __table_args__ = (
         db.ForeignKeyConstraint([entry_id, sense_index], [Sense.entry_id, Sense.index]),
+        db.Index(
+            "ix_JMdict_Gloss_text_fts", gloss_tsvector(text), postgresql_using="gin"
+        ),
     )
 
     def __repr__(self) -> str:
@@ -103,6 +128,27 @@ class LSource(db.Model):  # type: ignore  # <lsource> (within <sense>)
         )
 
 
+class GlossToken(db.Model):  # type: ignore  # inverted index of English glosses
+    __tablename__ = "JMdict_GlossToken"
+
+    token = db.Column(db.String, primary_key=True)  # normalised word in <gloss>
+    entry_id = db.Column(db.Integer, primary_key=True)
+    sense_index = db.Column(db.Integer, primary_key=True)
+    rank = db.Column(db.SmallInteger, nullable=False)  # lower is more common
+    length = db.Column(db.SmallInteger, nullable=False)  # tokens in shortest gloss
+
+    __table_args__ = (
+        db.ForeignKeyConstraint([entry_id, sense_index], [Sense.entry_id, Sense.index]),
+        db.Index("ix_JMdict_GlossToken_token_rank", token, rank, sense_index, length),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            "<JMdict_GlossToken token={0.token!r} entry_id={0.entry_id} "
+            "sense_index={0.sense_index}>".format(self)
+        )
+
+
 class ReadingWriting(db.Model):  # type: ignore
     __tablename__ = "JMdict_ReadingWriting"
 
@@ -0,0 +1,43 @@
+import re
+from typing import FrozenSet, Iterable, List, Optional, Pattern
+
+
+class PrefixMatcher:
+    """Match any of a set of command prefixes with a single compiled regex.
+
+    Longer prefixes are tried first, so "tg " wins over "t" for "tg help".
+    Mentions of the bot are matched as prefixes when user_id is given.
+    """
+
+    def __init__(self, prefixes: Iterable[str], *, user_id: Optional[int] = None):
+        self.prefixes: List[str] = list(dict.fromkeys(p for p in prefixes if p))
+        self.user_id: Optional[int] = user_id
+
+        parts: List[str] = [
+            re.escape(prefix) for prefix in sorted(self.prefixes, key=len, reverse=True)
+        ]
+        if user_id is not None:
+            # Same as commands.when_mentioned, with any whitespace after the mention
+            parts.insert(0, rf"<@!?{user_id}>\s+")
+
+        self.pattern: Optional[Pattern[str]] = None
+        if parts:
+            self.pattern = re.compile("|".join(parts))
+
+        # Messages not starting with one of these can be skipped without matching
+        self.first_chars: FrozenSet[str] = frozenset(
+            [prefix[0] for prefix in self.prefixes]
+            + (["<"] if user_id is not None else [])
+        )
+
+    def match(self, content: str) -> Optional[str]:
+        """Return the prefix at the start of content if there is one."""
+        if self.pattern is None:
+            return None
+        match = self.pattern.match(content)
+        if match is None:
+            return None
+        return match.group()
+
+    def __repr__(self) -> str:
+        return f"<PrefixMatcher prefixes={self.prefixes!r} user_id={self.user_id}>"
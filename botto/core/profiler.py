@@ -0,0 +1,166 @@
+import functools
+import logging
+import re
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from .metrics import add_time
+
+slow_query_logger = logging.getLogger("botto.slowquery")
+
+# GinoEngine methods that run a statement, all of them go through the pool
+QUERY_METHODS = ("all", "first", "one", "one_or_none", "scalar", "status")
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+# Quoted strings, numbers not part of identifiers and bind parameters
+LITERAL_PATTERN = re.compile(
+    r"'(?:[^']|'')*'|(?<![\w$])-?\d+(?:\.\d+)?\b|\$\d+|(?<!:):\w+"
+)
+IN_LIST_PATTERN = re.compile(r"\(\?(?:,\s*\?)+\)")
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_statement(statement: str) -> str:
+    """Collapse whitespace and replace literals and parameters with "?"."""
+    statement = WHITESPACE_PATTERN.sub(" ", statement).strip()
+    statement = LITERAL_PATTERN.sub("?", statement)
+    return IN_LIST_PATTERN.sub("(?)", statement)
+
+
+class QueryStats:
+    """Totals of the executions of a normalized statement."""
+
+    __slots__ = ("calls", "total", "max", "rows")
+
+    def __init__(self) -> None:
+        self.calls: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+        self.rows: int = 0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.calls if self.calls else 0.0
+
+
+def count_rows(method: str, result: Any) -> int:
+    if result is None:
+        return 0
+    if method == "all":
+        return len(result)
+    if method == "status":
+        # (status line, rows), eg. ("UPDATE 3", [])
+        status = result[0] if isinstance(result, tuple) else result
+        last = str(status).rpartition(" ")[2]
+        return int(last) if last.isdigit() else 0
+    return 1
+
+
+class QueryProfiler:
+    """Time the statements run through a Gino engine and the waits for its pool.
+
+    Parameters
+    ------------
+    threshold: float
+        Seconds above which a statement is logged to the botto.slowquery logger.
+    """
+
+    def __init__(self, threshold: float = 0.1) -> None:
+        self.threshold: float = threshold
+        self.statements: Dict[str, QueryStats] = {}
+        self.pool_waits: int = 0
+        # Acquires currently waiting for a connection
+        self.pool_waiting: int = 0
+        self.pool_wait_total: float = 0.0
+        self.pool_wait_max: float = 0.0
+        self.engine: Any = None
+
+    def install(self, engine: Any) -> None:
+        """Wrap the query methods of a bound GinoEngine and its pool acquire."""
+        if self.engine is engine:
+            return
+        self.engine = engine
+        for method in QUERY_METHODS:
+            setattr(engine, method, self._wrap_query(method, getattr(engine, method)))
+        # The Gino pool wrapper, which awaits the asyncpg pool
+        pool = engine._pool  # pylint: disable=protected-access
+        pool.acquire = self._wrap_acquire(pool.acquire)
+
+    def reset(self) -> None:
+        self.statements.clear()
+        self.pool_waits = 0
+        self.pool_wait_total = 0.0
+        self.pool_wait_max = 0.0
+
+    def _statement_text(self, clause: Any) -> str:
+        if isinstance(clause, str):
+            return clause
+        try:
+            return str(clause.compile(dialect=self.engine.dialect))
+        except Exception:  # pylint: disable=broad-except
+            return str(clause)
+
+    def _wrap_query(self, method: str, func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(clause: Any, *multiparams: Any, **params: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                result = await func(clause, *multiparams, **params)
+            except Exception:
+                self.record(clause, time.perf_counter() - start, 0)
+                raise
+            self.record(clause, time.perf_counter() - start, count_rows(method, result))
+            return result
+
+        return wrapper
+
+    def _wrap_acquire(self, func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            self.pool_waiting += 1
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                waited = time.perf_counter() - start
+                self.pool_waiting -= 1
+                self.pool_waits += 1
+                self.pool_wait_total += waited
+                self.pool_wait_max = max(self.pool_wait_max, waited)
+
+        return wrapper
+
+    def record(self, clause: Any, elapsed: float, rows: int) -> None:
+        add_time("db", elapsed)
+        statement = normalize_statement(self._statement_text(clause))
+        try:
+            stats = self.statements[statement]
+        except KeyError:
+            stats = self.statements[statement] = QueryStats()
+        stats.calls += 1
+        stats.total += elapsed
+        stats.max = max(stats.max, elapsed)
+        stats.rows += rows
+        if elapsed >= self.threshold:
+            slow_query_logger.warning(
+                "%.1f ms, %d rows: %s", elapsed * 1000, rows, statement
+            )
+
+    def top(self, count: int = 10) -> List[Tuple[str, QueryStats]]:
+        """Return (statement, stats) pairs with the highest total time."""
+        return sorted(
+            self.statements.items(), key=lambda item: item[1].total, reverse=True
+        )[:count]
+
+    def collect(self) -> List[str]:
+        """Prometheus lines of the pool wait time and statement totals."""
+        return [
+            "# TYPE botto_db_pool_wait_seconds summary",
+            f"botto_db_pool_wait_seconds_sum {self.pool_wait_total:.6f}",
+            f"botto_db_pool_wait_seconds_count {self.pool_waits}",
+            "# TYPE botto_db_queries_total counter",
+            f"botto_db_queries_total {sum(s.calls for s in self.statements.values())}",
+            "# TYPE botto_db_query_seconds_total counter",
+            f"botto_db_query_seconds_total "
+            f"{sum(s.total for s in self.statements.values()):.6f}",
+        ]
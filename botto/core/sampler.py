@@ -0,0 +1,210 @@
+import asyncio
+import collections
+import datetime
+import gc
+import logging
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import psutil
+
+logger = logging.getLogger("botto.sampler")
+
+SPARK_CHARACTERS = "▁▂▃▄▅▆▇█"
+
+
+class ProcessSample:
+    """Process and event loop statistics at a point in time."""
+
+    __slots__ = (
+        "time",
+        "cpu_percent",
+        "uss",
+        "rss",
+        "fds",
+        "threads",
+        "loop_lag",
+        "gc_counts",
+        "gc_collections",
+        "gc_collected",
+    )
+
+    def __init__(
+        self,
+        *,
+        cpu_percent: Optional[float],
+        uss: Optional[int],
+        rss: int,
+        fds: Optional[int],
+        threads: int,
+        loop_lag: float,
+        gc_counts: Tuple[int, int, int],
+        gc_collections: int,
+        gc_collected: int,
+    ) -> None:
+        self.time: datetime.datetime = datetime.datetime.utcnow()
+        # None for the first sample, which only sets psutil's reference point
+        self.cpu_percent: Optional[float] = cpu_percent
+        # USS needs access to /proc/<pid>/smaps, file descriptors are POSIX only
+        self.uss: Optional[int] = uss
+        self.rss: int = rss
+        self.fds: Optional[int] = fds
+        self.threads: int = threads
+        self.loop_lag: float = loop_lag
+        self.gc_counts: Tuple[int, int, int] = gc_counts
+        self.gc_collections: int = gc_collections
+        self.gc_collected: int = gc_collected
+
+    @property
+    def memory(self) -> int:
+        """USS if it could be read, otherwise RSS, in bytes."""
+        return self.uss if self.uss is not None else self.rss
+
+
+def read_process(process: psutil.Process) -> Dict[str, Any]:
+    # Blocking, memory_full_info reads /proc/<pid>/smaps
+    with process.oneshot():
+        stats: Dict[str, Any] = {
+            "cpu_percent": process.cpu_percent(),
+            "threads": process.num_threads(),
+        }
+        try:
+            memory = process.memory_full_info()
+        except psutil.AccessDenied:
+            memory = process.memory_info()
+        stats["rss"] = memory.rss
+        stats["uss"] = getattr(memory, "uss", None)
+        try:
+            stats["fds"] = process.num_fds()
+        except (AttributeError, psutil.AccessDenied):  # num_fds is POSIX only
+            stats["fds"] = None
+    return stats
+
+
+def sparkline(values: Sequence[float]) -> str:
+    """Render values as a line of block characters scaled to their range."""
+    if not values:
+        return ""
+    low, high = min(values), max(values)
+    scale = (len(SPARK_CHARACTERS) - 1) / (high - low) if high > low else 0
+    return "".join(SPARK_CHARACTERS[int((value - low) * scale)] for value in values)
+
+
+class ProcessSampler:
+    """Sample process statistics at a fixed interval into a ring buffer.
+
+    Parameters
+    ------------
+    process: psutil.Process
+        The process to sample.
+    run_blocking: Callable[..., Awaitable[Any]]
+        Runs a blocking function with arguments outside of the event loop.
+    interval: float
+        Seconds between samples.
+    size: int
+        Number of samples kept.
+    read_lag: Optional[Callable[[], float]]
+        Returns the event loop lag since the previous sample. The overshoot of the
+        sampler's own sleep is used if not given.
+    """
+
+    def __init__(
+        self,
+        process: psutil.Process,
+        run_blocking: Callable[..., Awaitable[Any]],
+        *,
+        interval: float = 10.0,
+        size: int = 360,
+        read_lag: Optional[Callable[[], float]] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> None:
+        self.process: psutil.Process = process
+        self.run_blocking = run_blocking
+        self.interval: float = interval
+        self.read_lag = read_lag
+        self.loop = loop or asyncio.get_event_loop()
+        self.samples: Deque[ProcessSample] = collections.deque(maxlen=size)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def latest(self) -> Optional[ProcessSample]:
+        return self.samples[-1] if self.samples else None
+
+    def start(self) -> None:
+        """Start sampling, taking the first sample right away."""
+        if self._task is None or self._task.done():
+            self._task = self.loop.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        # Sampled at once so statistics are shown while the bot starts up
+        loop_lag = self.read_lag() if self.read_lag is not None else 0.0
+        first = True
+        while True:
+            try:
+                await self.sample(loop_lag, cpu=not first)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Failed to sample process statistics.")
+            first = False
+            start = self.loop.time()
+            await asyncio.sleep(self.interval)
+            if self.read_lag is not None:
+                loop_lag = self.read_lag()
+            else:
+                loop_lag = max(0.0, self.loop.time() - start - self.interval)
+
+    async def sample(self, loop_lag: float, *, cpu: bool = True) -> ProcessSample:
+        """Take a sample, without CPU usage if cpu_percent was not called before."""
+        stats = await self.run_blocking(read_process, self.process)
+        if not cpu:
+            stats["cpu_percent"] = None
+        gc_stats = gc.get_stats()
+        sample = ProcessSample(
+            loop_lag=loop_lag,
+            gc_counts=gc.get_count(),
+            gc_collections=sum(gen["collections"] for gen in gc_stats),
+            gc_collected=sum(gen["collected"] for gen in gc_stats),
+            **stats,
+        )
+        self.samples.append(sample)
+        return sample
+
+    def history(self, name: str, count: Optional[int] = None) -> List[float]:
+        """Return the values of a sample attribute, oldest first, skipping None."""
+        samples = list(self.samples)[-count:] if count else self.samples
+        return [
+            getattr(sample, name)
+            for sample in samples
+            if getattr(sample, name) is not None
+        ]
+
+    def collect(self) -> List[str]:
+        sample = self.latest
+        if sample is None:
+            return []
+        values = {
+            "botto_process_cpu_percent": sample.cpu_percent,
+            "botto_process_uss_bytes": sample.uss,
+            "botto_process_rss_bytes": sample.rss,
+            "botto_process_open_fds": sample.fds,
+            "botto_process_threads": sample.threads,
+            "botto_event_loop_lag_seconds": sample.loop_lag,
+            "botto_gc_collections_total": sample.gc_collections,
+            "botto_gc_collected_total": sample.gc_collected,
+        }
+        return [
+            f"{name} {value}" for name, value in values.items() if value is not None
+        ]
@@ -0,0 +1,165 @@
+import asyncio
+import collections
+import sys
+from typing import Counter, Dict, Iterator, Optional, Tuple
+
+from ..utils.timerwheel import TimerWheel
+
+SessionKey = Tuple[int, int]
+
+
+class Session:
+    """An interactive session of a user in a channel.
+
+    Only IDs are kept, so a session does not keep messages or guilds alive.
+    """
+
+    __slots__ = ("user_id", "channel_id", "kind", "locks", "deadline", "task")
+
+    def __init__(
+        self,
+        user_id: int,
+        channel_id: int,
+        kind: str,
+        locks: bool,
+        deadline: float,
+        task: Optional[asyncio.Task],
+    ) -> None:
+        self.user_id: int = user_id
+        self.channel_id: int = channel_id
+        self.kind: str = kind
+        # Whether other commands of the user in the channel are ignored
+        self.locks: bool = locks
+        self.deadline: float = deadline
+        self.task: Optional[asyncio.Task] = task
+
+    @property
+    def key(self) -> SessionKey:
+        return (self.user_id, self.channel_id)
+
+
+class SessionRegistry:
+    """Interactive sessions keyed by (user_id, channel_id), expiring at a deadline.
+
+    A user has at most one session per channel. Expired sessions are removed by
+    a timer wheel and their task, if any, is cancelled, so sessions of commands
+    which crashed or never ended do not pile up.
+
+    Parameters
+    ------------
+    timeout: float
+        Seconds before sessions expire unless told otherwise.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout: float = 300.0,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> None:
+        self.timeout: float = timeout
+        self.loop = loop or asyncio.get_event_loop()
+        self.sessions: Dict[SessionKey, Session] = {}
+        self.expired: int = 0
+        self.deadlines: TimerWheel[SessionKey] = TimerWheel(self.expire, loop=self.loop)
+        self.deadlines.start()
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def __iter__(self) -> Iterator[Session]:
+        return iter(list(self.sessions.values()))
+
+    def get(self, user_id: int, channel_id: int) -> Optional[Session]:
+        return self.sessions.get((user_id, channel_id))
+
+    def is_locked(self, user_id: int, channel_id: int) -> bool:
+        session = self.sessions.get((user_id, channel_id))
+        return session is not None and session.locks
+
+    def start(
+        self,
+        user_id: int,
+        channel_id: int,
+        kind: str,
+        *,
+        locks: bool = False,
+        timeout: Optional[float] = None,
+        task: Optional[asyncio.Task] = None,
+    ) -> Session:
+        """Start a session, ending the session of the user in the channel if any."""
+        self.end(user_id, channel_id)
+        timeout = self.timeout if timeout is None else timeout
+        session = Session(
+            user_id, channel_id, kind, locks, self.loop.time() + timeout, task
+        )
+        self.sessions[session.key] = session
+        self.deadlines.schedule(session.key, timeout)
+        return session
+
+    def touch(self, session: Session, timeout: Optional[float] = None) -> None:
+        """Move the deadline of a session to timeout seconds from now."""
+        if self.sessions.get(session.key) is not session:
+            return
+        timeout = self.timeout if timeout is None else timeout
+        session.deadline = self.loop.time() + timeout
+        self.deadlines.schedule(session.key, timeout)
+
+    def end(self, user_id: int, channel_id: int, *, cancel: bool = True) -> None:
+        """End the session of a user in a channel, cancelling its task if cancel."""
+        session = self.sessions.pop((user_id, channel_id), None)
+        if session is None:
+            return
+        self.deadlines.cancel(session.key)
+        if cancel and session.task is not None:
+            session.task.cancel()
+
+    def end_session(self, session: Session, *, cancel: bool = False) -> None:
+        """End a session unless it has already been replaced."""
+        if self.sessions.get(session.key) is session:
+            self.end(session.user_id, session.channel_id, cancel=cancel)
+
+    def end_all(self, kind: Optional[str] = None) -> None:
+        for session in self:
+            if kind is None or session.kind == kind:
+                self.end(session.user_id, session.channel_id)
+
+    def expire(self, key: SessionKey) -> None:
+        session = self.sessions.pop(key, None)
+        if session is None:
+            return
+        self.expired += 1
+        if session.task is not None:
+            session.task.cancel()
+
+    def close(self) -> None:
+        self.deadlines.stop()
+        self.end_all()
+
+    # ------ Statistics ------
+
+    def counts(self) -> Counter[str]:
+        return collections.Counter(session.kind for session in self.sessions.values())
+
+    def memory_usage(self) -> int:
+        """Approximate bytes used by the registry, its sessions and their keys."""
+        return (
+            sys.getsizeof(self.sessions)
+            + sum(
+                sys.getsizeof(session) + sys.getsizeof(key)
+                for key, session in self.sessions.items()
+            )
+            + sum(
+                sys.getsizeof(slot)
+                for slot in self.deadlines._slots  # pylint: disable=protected-access
+            )
+        )
+
+    def collect(self) -> Iterator[str]:
+        yield "# TYPE botto_sessions gauge"
+        for kind, count in self.counts().items():
+            yield f'botto_sessions{{kind="{kind}"}} {count}'
+        yield "# TYPE botto_sessions_expired_total counter"
+        yield f"botto_sessions_expired_total {self.expired}"
+        yield "# TYPE botto_sessions_memory_bytes gauge"
+        yield f"botto_sessions_memory_bytes {self.memory_usage()}"
@@ -2,7 +2,6 @@ import asyncio
 import datetime
 import logging
 import traceback
-from typing import List
 
 import aiohttp
 import discord
@@ -20,11 +19,16 @@ class Events(commands.Cog):
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message) -> None:
-        if message.author.bot or not message.content:
+        # Only a message consisting of a mention of the bot gets a reply
+        if message.author.bot or not message.content.startswith("<@"):
             return
-        # Note: Change this if not using commands.when_mentioned_or(*prefixes).
-        if botto.config["PREFIXES"]:
-            prefixes = botto.config["PREFIXES"]
+        user_id: int = self.bot.user.id
+        if message.content not in (f"<@{user_id}>", f"<@!{user_id}>"):
+            return
+
+        # Note: Change this if not using mentions in addition to prefixes.
+        prefixes = self.bot.get_guild_prefixes(message.guild)
+        if prefixes:
             content = (
                 f"My commands prefixes are {self.bot.user.mention} and "
                 f"`{prefixes[0]}`. Commands can be viewed using the "
@@ -36,12 +40,10 @@ class Events(commands.Cog):
                 f"using the `@{self.bot.user.name} help` command."
             )
 
-        mentions: List[str] = [f"<@{self.bot.user.id}>", f"<@!{self.bot.user.id}>"]
-        if message.content in mentions:
-            try:
-                await message.channel.send("Hello! " + content)
-            except discord.Forbidden:
-                pass
+        try:
+            await message.channel.send("Hello! " + content)
+        except discord.Forbidden:
+            pass
 
     @commands.Cog.listener()
     async def on_guild_join(self, guild: discord.Guild) -> None:
@@ -1,11 +1,12 @@
 import inspect
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import discord
 from discord.ext import commands
-import yaml
 
 import botto
+from botto.core.command import load_docstring
+from botto.utils.embed_layout import FIELD_VALUE_LIMIT, EmbedPacker, make_fields
 
 BotMapping = Dict[Optional[commands.Cog], List[commands.Command]]
 
@@ -20,43 +21,24 @@ class HelpCommand(commands.HelpCommand):
         commands = await super().filter_commands(commands, sort=sort, key=key)
         return [command for command in commands if command.enabled]
 
+    def command_line(self, command: commands.Command) -> str:
+        return f"`{self.clean_prefix}{command}` — {command.short_doc}"
+
     async def get_bot_help(self, mapping: BotMapping) -> List[discord.Embed]:
-        embeds: List[discord.Embed] = []
-        last_embed = None
-        last_cog = None
-        last_content = None
+        packer = EmbedPacker(lambda: discord.Embed(colour=self.colour))
         for cog, cmds in mapping.items():
             cmds = await self.filter_commands(cmds)
             if not cog or not cmds:
                 continue
-            if last_embed is None:
-                embed = discord.Embed(colour=self.colour)
-            else:
-                embed = last_embed
-            if last_content:
-                embed.add_field(name=last_cog, value=last_content, inline=False)
-                last_cog = None
-                last_content = None
-            content = "\n".join(
-                f"`{self.clean_prefix}{cmd}` — {cmd.short_doc}" for cmd in cmds
-            )
-            if len(content) > 1024:
+            content = "\n".join(self.command_line(cmd) for cmd in cmds)
+            if len(content) > FIELD_VALUE_LIMIT:
                 content = (
                     f"There are {len(cmds)} commands available. Type "
                     f"`{self.clean_prefix}{self.invoked_with} {cog.qualified_name}` "
                     f"to learn more."
                 )
-            before = embed.copy()
-            embed.add_field(name=cog.qualified_name, value=content, inline=False)
-            if len(embed) > 6000:
-                embeds.append(before)
-                last_embed = None
-                last_cog = cog.qualified_name
-                last_content = content
-            else:
-                last_embed = embed
-        embeds.append(last_embed)
-        return embeds
+            packer.add_field(name=cog.qualified_name, value=content, inline=False)
+        return packer.embeds
 
     async def send_bot_help(self, mapping: BotMapping) -> List[discord.Message]:
         messages = []
@@ -66,14 +48,19 @@ class HelpCommand(commands.HelpCommand):
             messages.append(msg)
         return messages
 
-    async def make_cog_embed(self, cog: commands.Cog) -> Optional[discord.Embed]:
+    @property
+    def help_cache(self) -> Dict[Any, Any]:
+        return self.context.bot.help_cache
+
+    def build_cog_embed(self, cog: commands.Cog) -> Optional[discord.Embed]:
         docstring = inspect.getdoc(cog)
         if not docstring:
             return None
-        items = yaml.full_load(docstring.format(cog=cog))  # value substitution
+        items = load_docstring(docstring.format(cog=cog))  # value substitution
         if not isinstance(items, dict):
             # For docstrings without format (eg. third party commands like jishaku)
             return None
+        items = dict(items)
         embed = discord.Embed(
             colour=items.pop("colour", self.colour),
             description=items.pop("description", "No description available."),
@@ -90,77 +77,48 @@ class HelpCommand(commands.HelpCommand):
             embed.add_field(name=k, value=v, inline=inline)
         return embed
 
+    async def make_cog_embed(self, cog: commands.Cog) -> Optional[discord.Embed]:
+        key = ("cog", cog.qualified_name)
+        try:
+            embed = self.help_cache[key]
+        except KeyError:
+            embed = self.help_cache[key] = self.build_cog_embed(cog)
+        if embed is None:
+            return None
+        return embed.copy()
+
     async def get_cog_help(self, cog: commands.Cog) -> List[discord.Embed]:
-        """Return one or two embeds for cog help in a list.
+        """Return embeds for cog help in a list.
 
         First embed is the cog's help embed (or formatted docstring) if any.
-        If there is enough space, all commands will be in the first embed.
-        Otherwise, second embed is all commands.
-
-        If the docstring is unformatted, one embed will be returned.
-        Its description will be the cog description, fields are all commands.
+        Command fields are added to it while there is enough space, then to
+        following embeds with the cog description.
 
-        Assumption: Second or only embed's total character count does not exceed 6000.
+        If the docstring is unformatted, the first embed's description will be the
+        cog description instead.
         """
-        embeds: List[discord.Embed] = []
+        first: Optional[discord.Embed]
         if hasattr(cog, "_help_embed_func"):
-            embed = await cog.get_help_embed(self)
-            embeds.append(embed)
+            first = await cog.get_help_embed(self)
         else:
-            embed = await self.make_cog_embed(cog)
-            if embed:
-                embeds.append(embed)
+            first = await self.make_cog_embed(cog)
         cmds = await self.filter_commands(cog.get_commands())
         if not cmds:
             error = self.command_not_found(cog.qualified_name)
             await self.send_error_message(error)
             return []
-        if embeds:
-            before = embed.copy()
-        else:
-            embed = discord.Embed(
-                colour=self.colour, description=cog.description or discord.Embed.Empty
-            )
-            embed.set_author(name=cog.qualified_name)
 
-        def add_command_fields(embed: discord.Embed) -> None:
-            last_start_index = 0
-            last_content: List[str] = []
-            for i, cmd in enumerate(cmds):
-                content = f"`{self.clean_prefix}{cmd}` — {cmd.short_doc}"
-                if len("\n".join(last_content + [content])) <= 1024:
-                    last_content.append(content)
-                else:
-                    embed.add_field(
-                        name=f"Commands ({last_start_index + 1}-{i}/{len(cmds)})",
-                        value="\n".join(last_content),
-                        inline=False,
-                    )
-                    last_start_index = i
-                    last_content = [content]
-                if i == len(cmds) - 1 and last_start_index == 0:
-                    embed.add_field(
-                        name="Commands", value="\n".join(last_content), inline=False
-                    )
-                elif i == len(cmds) - 1:
-                    embed.add_field(
-                        name=f"Commands ({last_start_index + 1}-{i + 1}/{len(cmds)})",
-                        value="\n".join(last_content),
-                        inline=False,
-                    )
-
-        add_command_fields(embed)
-        if len(embed) > 6000 and embeds:
-            embeds[0] = before
+        def make_embed() -> discord.Embed:
             embed = discord.Embed(
-                colour=before.colour, description=cog.description or discord.Embed.Empty
+                colour=first.colour if first else self.colour,
+                description=cog.description or discord.Embed.Empty,
             )
             embed.set_author(name=cog.qualified_name)
-            add_command_fields(embed)
-            embeds.append(embed)
-        elif not embeds:
-            embeds.append(embed)
-        return embeds
+            return embed
+
+        packer = EmbedPacker(make_embed, first=first)
+        packer.add_fields(make_fields("Commands", [self.command_line(c) for c in cmds]))
+        return packer.embeds
 
     async def send_cog_help(self, cog: commands.Cog) -> List[discord.Message]:
         # cog cannot be None apparently
@@ -171,50 +129,67 @@ class HelpCommand(commands.HelpCommand):
             messages.append(msg)
         return messages
 
-    async def make_command_embed(self, command: commands.Command) -> discord.Embed:
+    def build_command_embed(
+        self, command: commands.Command
+    ) -> Tuple[discord.Embed, bool]:
+        """Build a command's help embed without any prefix dependent values.
+
+        Return the embed and whether its author should be set to the command usage.
+        """
         docstring = inspect.getdoc(command.callback)
         if not docstring:
             embed = discord.Embed(
                 colour=self.colour, description="No description available."
             )
-            embed.set_author(name=f"{self.clean_prefix}{command} {command.signature}")
             if command.aliases:
                 embed.add_field(
                     name="Aliases", value=" // ".join(command.aliases), inline=False
                 )
-            return embed
-        items = yaml.full_load(docstring.format(command=command))  # value substitution
+            return (embed, True)
+        items = load_docstring(docstring.format(command=command))  # value substitution
         if not isinstance(items, dict):
             # For docstrings without format (eg. third party commands like jishaku)
             embed = discord.Embed(colour=self.colour, description=docstring)
-            embed.set_author(name=f"{self.clean_prefix}{command} {command.signature}")
             if command.aliases:
                 embed.add_field(
                     name="Aliases", value=" // ".join(command.aliases), inline=False
                 )
-        else:
-            embed = discord.Embed(
-                colour=items.pop("colour", self.colour),
-                description=items.pop("description", "No description available."),
+            return (embed, True)
+
+        items = dict(items)
+        embed = discord.Embed(
+            colour=items.pop("colour", self.colour),
+            description=items.pop("description", "No description available."),
+        )
+        add_usage = "name" not in items
+        if not add_usage:
+            embed.set_author(name=items.pop("name"))
+        embed.set_footer(text=items.pop("footer", discord.Embed.Empty))
+        embed.set_thumbnail(url=items.pop("thumbnail", ""))
+        embed.set_image(url=items.pop("image", ""))
+        items.pop("short", None)
+        for k, v in items.items():
+            inline = k.endswith(" (inline)")
+            if inline:
+                k = k[:-9]
+            embed.add_field(name=k, value=v, inline=inline)
+        if command.aliases and items.pop("add_aliases", True):
+            embed.add_field(
+                name="Aliases", value=" // ".join(command.aliases), inline=False
             )
-            embed.set_author(
-                name=items.pop(
-                    "name", f"{self.clean_prefix}{command} {command.signature}"
-                )
+        return (embed, add_usage)
+
+    async def make_command_embed(self, command: commands.Command) -> discord.Embed:
+        key = ("command", command.qualified_name)
+        try:
+            template, add_usage = self.help_cache[key]
+        except KeyError:
+            template, add_usage = self.help_cache[key] = self.build_command_embed(
+                command
             )
-            embed.set_footer(text=items.pop("footer", discord.Embed.Empty))
-            embed.set_thumbnail(url=items.pop("thumbnail", ""))
-            embed.set_image(url=items.pop("image", ""))
-            items.pop("short", None)
-            for k, v in items.items():
-                inline = k.endswith(" (inline)")
-                if inline:
-                    k = k[:-9]
-                embed.add_field(name=k, value=v, inline=inline)
-            if command.aliases and items.pop("add_aliases", True):
-                embed.add_field(
-                    name="Aliases", value=" // ".join(command.aliases), inline=False
-                )
+        embed = template.copy()
+        if add_usage:
+            embed.set_author(name=f"{self.clean_prefix}{command} {command.signature}")
         return embed
 
     async def get_command_help(self, command: commands.Command) -> discord.Embed:
@@ -231,30 +206,10 @@ class HelpCommand(commands.HelpCommand):
 
         # Subcommand list handling
         cmds = await self.filter_commands(command.commands)
-        last_start_index = 0
-        last_content: List[str] = []
-        for i, cmd in enumerate(cmds):
-            content = f"`{self.clean_prefix}{cmd}` — {cmd.short_doc}"
-            if len("\n".join(last_content + [content])) <= 1024:
-                last_content.append(content)
-            else:
-                embed.add_field(
-                    name=f"Subcommands ({last_start_index + 1}-{i}/{len(cmds)})",
-                    value="\n".join(last_content),
-                    inline=False,
-                )
-                last_start_index = i
-                last_content = [content]
-            if i == len(cmds) - 1 and last_start_index == 0:
-                embed.add_field(
-                    name="Subcommands", value="\n".join(last_content), inline=False
-                )
-            elif i == len(cmds) - 1:
-                embed.add_field(
-                    name=f"Subcommands ({last_start_index + 1}-{i + 1}/{len(cmds)})",
-                    value="\n".join(last_content),
-                    inline=False,
-                )
+        for name, value in make_fields(
+            "Subcommands", [self.command_line(cmd) for cmd in cmds]
+        ):
+            embed.add_field(name=name, value=value, inline=False)
         return embed
 
     async def send_command_help(self, command: commands.Command) -> discord.Message:
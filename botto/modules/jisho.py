@@ -1,14 +1,87 @@
-from typing import List
+import asyncio
+import functools
+import logging
+from typing import Dict, List, Optional, Set
 from urllib.parse import quote_plus
 
 import aiohttp  # type: ignore
+import asyncpg  # type: ignore
 import discord  # type: ignore
-from kanaconv import KanaConv  # type: ignore
 from discord.ext import commands  # type: ignore
+from gino.exceptions import GinoException  # type: ignore
 
 import botto
+from botto.core.models.jmdict import (
+    WritingElement,
+    ReadingElement,
+    Sense as SenseModel,
+    Gloss,
+    ReadingWriting,
+    gloss_tsvector,
+)
+from botto.utils.jmdict import tokenize
+from botto.utils.romaji import is_romaji, to_romaji_bulk
+
+logger = logging.getLogger("botto.jisho")
+
+# Jisho search syntax the local search does not understand: tags and wildcards
+REMOTE_ONLY_CHARACTERS = frozenset("#*?")
+
+# Priority tags which jisho.org considers to be common words
+COMMON_PRIORITIES = ("news1", "ichi1", "spec1", "spec2", "gai1")
+
+# Ranked prefix search on writings and readings
+FIND_JAPANESE_QUERY = """
+SELECT
+    m.entry_id
+FROM (
+    SELECT entry_id, literal, priority
+    FROM "JMdict_WritingElement"
+    WHERE literal LIKE :pattern
+    UNION ALL
+    SELECT entry_id, literal, priority
+    FROM "JMdict_ReadingElement"
+    WHERE literal LIKE :pattern
+) AS m
+GROUP BY
+    m.entry_id
+ORDER BY
+    bool_or(m.literal = :word) DESC,
+    bool_or(m.priority && :common) DESC,
+    min(length(m.literal)),
+    m.entry_id
+LIMIT :limit;
+"""
+
+# Entries with every token of a query through the gloss token index
+FIND_ENGLISH_QUERY = """
+SELECT
+    entry_id
+FROM
+    "JMdict_GlossToken"
+WHERE
+    token = ANY(:tokens)
+GROUP BY
+    entry_id
+HAVING
+    count(DISTINCT token) = :count
+ORDER BY
+    min(rank),
+    min(sense_index),
+    min(length),
+    entry_id
+LIMIT :limit;
+"""
 
-romanizer = KanaConv()  # pylint: disable=invalid-name
+# Which parts of the local search are usable, see botto/utils/jmdict.py to set
+# them up: the JMdict entries, the gloss token index and the full-text index
+LOCAL_FEATURES_QUERY = """
+SELECT
+    to_regclass('"JMdict_WritingElement"') IS NOT NULL
+        AND to_regclass('"JMdict_ReadingElement"') IS NOT NULL AS entries,
+    to_regclass('"JMdict_GlossToken"') IS NOT NULL AS tokens,
+    to_regclass('"ix_JMdict_Gloss_text_fts"') IS NOT NULL AS fulltext;
+"""
 
 # This exists because otherwise mypy will go cranky.
 clean_content = commands.clean_content(  # pylint: disable=invalid-name
@@ -51,10 +124,76 @@ class Link:  # pylint: disable=too-few-public-methods
 
 
 class Jisho(commands.Cog):
+
+    # Run with LIMIT 0 on every pooled connection at startup, which prepares the
+    # statements without scanning anything
+    warm_up_queries = [
+        (
+            FIND_JAPANESE_QUERY,
+            dict(word="", pattern="", common=list(COMMON_PRIORITIES), limit=0),
+        ),
+        (FIND_ENGLISH_QUERY, dict(tokens=[], count=0, limit=0)),
+    ]
+
     def __init__(self, bot: botto.Botto) -> None:
         self.bot: botto.Botto = bot
+        self._local_features: Optional[Set[str]] = None
+
+    async def local_features(self) -> Set[str]:
+        """Return which of entries, tokens and fulltext the database has.
+
+        Looked up on the first local search, reload the cog after an import.
+        """
+        if self._local_features is None:
+            row = await self.bot.db.first(self.bot.db.text(LOCAL_FEATURES_QUERY))
+            features = {key for key, value in row.items() if value}
+            if "tokens" in features and not await self.bot.db.scalar(
+                self.bot.db.text('SELECT EXISTS (SELECT 1 FROM "JMdict_GlossToken");')
+            ):
+                features.discard("tokens")
+            if "entries" not in features:
+                logger.warning("JMdict tables are missing, searching jisho.org only.")
+            self._local_features = features
+        return self._local_features
+
+    def can_search_locally(self, word: str) -> bool:
+        """Whether a query can be looked up in the local JMdict tables.
+
+        Queries with Jisho's tags or wildcards, and queries mixing Japanese and
+        English words, are only understood by jisho.org.
+        """
+        if not botto.config["DATABASE_URI"] or not botto.config.get(
+            "JISHO_LOCAL_SEARCH", True
+        ):
+            return False
+        if not REMOTE_ONLY_CHARACTERS.isdisjoint(word):
+            return False
+        return word.isascii() or not any(c.isascii() and c.isalpha() for c in word)
 
     async def search(self, word: str) -> List[JishoEntry]:
+        """Search the local JMdict tables, or jisho.org for what they cannot answer.
+
+        jisho.org is queried when the local search is unavailable or fails, and
+        for romaji queries, which the local search takes for English. Other
+        queries without local results only go to jisho.org if JISHO_REMOTE_FALLBACK
+        is enabled.
+        """
+        if not self.can_search_locally(word):
+            return await self.search_remote(word)
+        try:
+            if "entries" not in await self.local_features():
+                return await self.search_remote(word)
+            entries = await self.search_local(word)
+        except (asyncpg.PostgresError, GinoException):
+            logger.exception("Local JMdict search failed for %r.", word)
+            return await self.search_remote(word)
+        if not entries and (
+            is_romaji(word) or botto.config.get("JISHO_REMOTE_FALLBACK", False)
+        ):
+            return await self.search_remote(word)
+        return entries
+
+    async def search_remote(self, word: str) -> List[JishoEntry]:
         word = quote_plus(word)
         response = await self.bot.session.get(
             f"https://jisho.org/api/v1/search/words?keyword={word}"
@@ -62,10 +201,187 @@ class Jisho(commands.Cog):
         entries = await response.json()
         return [JishoEntry(e) for e in entries["data"]]
 
+    async def search_local(self, word: str, limit: int = 20) -> List[JishoEntry]:
+        word = word.strip()
+        if not word:
+            return []
+        if word.isascii():
+            entry_ids = await self.find_english(word, limit)
+        else:
+            entry_ids = await self.find_japanese(word, limit)
+        if not entry_ids:
+            return []
+        return await self.get_entries(entry_ids)
+
+    async def find_japanese(self, word: str, limit: int) -> List[int]:
+        """Find entry IDs by exact or prefix match on writings and readings.
+
+        Exact matches rank first, followed by common words and shorter literals.
+        """
+        pattern = (
+            word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        )
+        rows = await self.bot.db.all(
+            self.bot.db.text(FIND_JAPANESE_QUERY),
+            word=word,
+            pattern=pattern,
+            common=list(COMMON_PRIORITIES),
+            limit=limit,
+        )
+        return [row[0] for row in rows]
+
+    async def find_english(self, word: str, limit: int) -> List[int]:
+        """Find entry IDs through the gloss token index.
+
+        Entries must have every token of the query in their glosses and are ranked
+        by word priority, sense order and gloss length. Queries made up of stopwords
+        only or without any results fall back to full-text search, when indexed.
+        """
+        features = await self.local_features()
+        tokens = tokenize(word)
+        if tokens and "tokens" in features:
+            rows = await self.bot.db.all(
+                self.bot.db.text(FIND_ENGLISH_QUERY),
+                tokens=tokens,
+                count=len(tokens),
+                limit=limit,
+            )
+            if rows:
+                return [row[0] for row in rows]
+        if "fulltext" not in features:
+            return []
+        return await self.find_english_fulltext(word, limit)
+
+    async def find_english_fulltext(self, word: str, limit: int) -> List[int]:
+        """Find entry IDs through the full-text index on English glosses."""
+        query = self.bot.db.func.plainto_tsquery(
+            self.bot.db.literal_column("'english'::regconfig"), word
+        )
+        rows = await (
+            self.bot.db.select([Gloss.entry_id])
+            .where(gloss_tsvector(Gloss.text).op("@@")(query))
+            .group_by(Gloss.entry_id)
+            .order_by(
+                self.bot.db.func.min(Gloss.sense_index),
+                self.bot.db.func.min(self.bot.db.func.length(Gloss.text)),
+                Gloss.entry_id,
+            )
+            .limit(limit)
+            .gino.all()
+        )
+        return [row[0] for row in rows]
+
+    async def get_entries(self, entry_ids: List[int]) -> List[JishoEntry]:
+        """Build JishoEntry objects in the order of entry_ids from the JMdict tables."""
+        writings, readings, readings_writings, senses, glosses = await asyncio.gather(
+            WritingElement.query.where(
+                WritingElement.entry_id.in_(entry_ids)
+            ).gino.all(),
+            ReadingElement.query.where(
+                ReadingElement.entry_id.in_(entry_ids)
+            ).gino.all(),
+            ReadingWriting.query.where(
+                ReadingWriting.entry_id.in_(entry_ids)
+            ).gino.all(),
+            SenseModel.query.where(SenseModel.entry_id.in_(entry_ids))
+            .order_by(SenseModel.entry_id, SenseModel.index)
+            .gino.all(),
+            Gloss.query.where(Gloss.entry_id.in_(entry_ids))
+            .where(Gloss.lang == "eng")
+            .gino.all(),
+        )
+
+        data: Dict[int, dict] = {
+            entry_id: {
+                "is_common": False,
+                "japanese": [],
+                "senses": [],
+                "attribution": {"jmdict": True},
+            }
+            for entry_id in entry_ids
+        }
+
+        writing_literals: Dict[int, List[str]] = {}
+        for elem in sorted(writings, key=lambda e: -len(e.priority)):
+            writing_literals.setdefault(elem.entry_id, []).append(elem.literal)
+            if set(elem.priority) & set(COMMON_PRIORITIES):
+                data[elem.entry_id]["is_common"] = True
+
+        reading_writings: Dict[tuple, List[str]] = {}
+        for relation in readings_writings:
+            key = (relation.entry_id, relation.reading_literal)
+            reading_writings.setdefault(key, []).append(relation.writing_literal)
+
+        for elem in sorted(readings, key=lambda e: -len(e.priority)):
+            entry = data[elem.entry_id]
+            if set(elem.priority) & set(COMMON_PRIORITIES):
+                entry["is_common"] = True
+            related = reading_writings.get((elem.entry_id, elem.literal), [])
+            # Keep the writing order (most prioritised first) for the pairs
+            for writing in writing_literals.get(elem.entry_id, []):
+                if writing in related:
+                    entry["japanese"].append({"word": writing, "reading": elem.literal})
+            if not related:
+                entry["japanese"].append({"reading": elem.literal})
+
+        # Entries without readings do not exist in JMdict, but just in case
+        for entry_id, literals in writing_literals.items():
+            if not data[entry_id]["japanese"]:
+                data[entry_id]["japanese"] = [{"word": w} for w in literals]
+
+        definitions: Dict[tuple, List[str]] = {}
+        for gloss in glosses:
+            if gloss.text is not None:
+                key = (gloss.entry_id, gloss.sense_index)
+                definitions.setdefault(key, []).append(gloss.text)
+
+        for sense in senses:
+            english = definitions.get((sense.entry_id, sense.index))
+            if not english:
+                continue  # Senses with glosses in other languages only
+            data[sense.entry_id]["senses"].append(
+                {
+                    "english_definitions": english,
+                    "parts_of_speech": sense.parts_of_speech,
+                    "tags": sense.misc + sense.fields + sense.dialects,
+                    "see_also": sense.references,
+                    "antonyms": sense.antonyms,
+                    "info": sense.info,
+                }
+            )
+
+        return [JishoEntry(data[entry_id]) for entry_id in entry_ids]
+
+    @staticmethod
+    def format_entry(entry: JishoEntry, romaji: Dict[str, str]) -> str:
+        page = []
+
+        # Japanese and readings
+        for jap in entry.japanese:
+            if jap.word and jap.reading:
+                page.append(f"**{jap.word}（{jap.reading}）** *{romaji[jap.reading]}*")
+            elif jap.reading:
+                page.append(f"**{jap.reading}** *{romaji[jap.reading]}*")
+            else:  # jap.word only
+                page.append(f"**{jap.word}**")
+        if entry.is_common:
+            page.append("(common word)")
+        page.append("")
+
+        # Senses (definitions)
+        for i, sense in enumerate(entry.senses, 1):
+            if sense.parts_of_speech:
+                parts = "(" + ", ".join(p.lower() for p in sense.parts_of_speech) + ") "
+            else:
+                parts = ""
+            page.append(f"{i}. {parts}{'; '.join(sense.english_definitions)}")
+            for link in sense.links:
+                page.append(f"[{link.text}]({link.url})")
+
+        return "\n".join(page)
+
     @botto.command(aliases=["j", "じしょ", "辞書"])
-    async def jisho(  # pylint: disable=too-many-branches
-        self, ctx: botto.Context, *, word: clean_content  # type: ignore
-    ):
+    async def jisho(self, ctx: botto.Context, *, word: clean_content):  # type: ignore
         """Look up a Japanese or English word."""
         try:
             entries = await self.search(word)
@@ -76,39 +392,12 @@ class Jisho(commands.Cog):
             await ctx.send(f"Could not look up {word} in the dictionary.")
             return
 
-        pages = []
-        for entry in entries:
-            page = []
-
-            # Japanese and readings
-            for jap in entry.japanese:
-                if jap.reading:
-                    romaji = romanizer.to_romaji(jap.reading)
-                if jap.word and jap.reading:
-                    page.append(f"**{jap.word}（{jap.reading}）** *{romaji}*")
-                elif jap.reading:
-                    page.append(f"**{jap.reading}** *{romaji}*")
-                else:  # jap.word only
-                    page.append(f"**{jap.word}**")
-            if entry.is_common:
-                page.append("(common word)")
-            page.append("")
-
-            # Senses (definitions)
-            for i, sense in enumerate(entry.senses, 1):
-                if sense.parts_of_speech:
-                    parts = (
-                        "(" + ", ".join(p.lower() for p in sense.parts_of_speech) + ") "
-                    )
-                else:
-                    parts = ""
-                page.append(f"{i}. {parts}{'; '.join(sense.english_definitions)}")
-                for link in sense.links:
-                    page.append(f"[{link.text}]({link.url})")
-
-            pages.append("\n".join(page))
-
-        paginator = botto.utils.EmbedPaginator(ctx, entries=pages, per_page=1)
+        romaji = to_romaji_bulk(
+            jap.reading for entry in entries for jap in entry.japanese
+        )
+        pages = [functools.partial(self.format_entry, entry, romaji) for entry in entries]
+
+        paginator = botto.utils.EmbedPaginator(ctx, pages=pages)
         paginator.embed.set_author(name=f"Jisho entries related to {word}")
         await paginator.paginate()
 
@@ -118,8 +407,10 @@ class Jisho(commands.Cog):
         embed.set_author(name=self.jisho.name + " " + self.jisho.signature)
         embed.description = (
             f"{self.jisho.short_doc}\n\n"  # pylint: disable=no-member
-            f"botto queries entries from [Jisho](https://jisho.org/) and displays them "
-            f"in Discord for you and your friends.\n\n"
+            f"botto looks up entries of the [JMdict](https://www.edrdg.org/jmdict/"
+            f"j_jmdict.html) Japanese-English dictionary and displays them in Discord "
+            f"for you and your friends. Searches it cannot do itself, such as romaji, "
+            f"tags and wildcards, are sent to [Jisho](https://jisho.org/).\n\n"
             f"To quote their main page, Jisho is a powerful Japanese-English "
             f"dictionary. It lets you find words, kanji, example sentences and more "
             f"quickly and easily. Enter any Japanese text or English word and Jisho "
@@ -6,7 +6,6 @@ from discord.ext import commands  # type: ignore
 
 import botto
 from botto.core.models.kanjidic2 import Kanji, KanjiMeaningsReadings
-from botto.utils import kanjivg_gif, kanimaji
 
 
 class KanjiSearch(commands.Cog):
@@ -36,8 +35,11 @@ class KanjiSearch(commands.Cog):
         if not os.path.isfile(filename):
             raise ValueError("No stroke diagram found.")
         output = f"resources/data/kanjivg_gif/{codepoint}.gif"
-        await self.bot.loop.run_in_executor(
-            None, kanjivg_gif.create_gif, filename, output
+        # Imported on first use, lxml, svg.path and PIL are slow to import
+        from botto.utils import kanjivg_gif
+
+        await self.bot.run_in_executor(
+            kanjivg_gif.create_gif, filename, output, executor="cpu"
         )
         return discord.File(
             output, f"{unicodedata.name(character)}.gif".replace(" ", "_")
@@ -49,8 +51,10 @@ class KanjiSearch(commands.Cog):
         if not os.path.isfile(filename):
             raise ValueError("No stroke diagram found.")
         output = f"resources/data/kanjivg_kanimaji_gif/{codepoint}_anim.gif"
-        await self.bot.loop.run_in_executor(
-            None, kanimaji.create_gif, filename, output
+        from botto.utils import kanimaji
+
+        await self.bot.run_in_executor(
+            kanimaji.create_gif, filename, output, executor="cpu"
         )
         return discord.File(
             output, f"{unicodedata.name(character)}.gif".replace(" ", "_")
@@ -1,10 +1,13 @@
+import collections
 import platform
 import datetime
+from typing import Any, Counter, Dict, Optional, Tuple
 
 import discord
 from discord.ext import commands
 
 import botto
+from botto.core.ipc import IPCError
 
 
 class Meta(commands.Cog):
@@ -12,36 +15,199 @@ class Meta(commands.Cog):
 
     def __init__(self, bot: botto.Botto) -> None:
         self.bot: botto.Botto = bot
+        # Statistics kept up to date by the listeners below, so that building the
+        # statistics embed does not walk every member and channel
+        self.total_members: int = 0
+        self.text_channels: int = 0
+        self.voice_channels: int = 0
+        # User ID to the number of guilds in which the user is seen as online
+        self.online_users: Counter[int] = collections.Counter()
+        # Guild ID to the counts added for the guild, subtracted when it goes away
+        self.guild_counts: Dict[int, Tuple[int, int, int]] = {}
+        for guild in self.bot.guilds:
+            self.add_guild(guild)
+        if self.bot.ipc is not None:
+            self.bot.ipc.handlers["stats"] = self.get_statistics
 
-    def get_statistics_embed(self) -> discord.Embed:
-        total_members: int = sum(1 for m in self.bot.get_all_members())
-        total_users: int = self.bot.user_count
-        total_online: int = len(
-            {
-                m
-                for m in self.bot.get_all_members()
-                if m.status is not discord.Status.offline
-            }
-        )
+    def cog_unload(self) -> None:
+        if self.bot.ipc is not None:
+            self.bot.ipc.handlers.pop("stats", None)
 
-        text_channels: int = sum(
-            1
-            for channel in self.bot.get_all_channels()
-            if isinstance(channel, discord.TextChannel)
-        )
-        voice_channels: int = sum(
-            1
-            for channel in self.bot.get_all_channels()
-            if isinstance(channel, discord.VoiceChannel)
+    # ------ Statistics counters ------
+
+    def add_guild(self, guild: discord.Guild) -> None:
+        self.remove_guild(guild)
+        counts = (
+            # Members may not be cached, depending on the cache profile
+            guild.member_count or len(guild.members),
+            len(guild.text_channels),
+            len(guild.voice_channels),
         )
+        self.guild_counts[guild.id] = counts
+        self.total_members += counts[0]
+        self.text_channels += counts[1]
+        self.voice_channels += counts[2]
+        for member in guild.members:
+            if member.status is not discord.Status.offline:
+                self.online_users[member.id] += 1
+
+    def remove_guild(self, guild: discord.Guild) -> None:
+        counts = self.guild_counts.pop(guild.id, None)
+        if counts is None:
+            return
+        self.total_members -= counts[0]
+        self.text_channels -= counts[1]
+        self.voice_channels -= counts[2]
+        for member in guild.members:
+            if member.status is not discord.Status.offline:
+                self.set_offline(member.id)
+
+    def set_offline(self, user_id: int) -> None:
+        self.online_users[user_id] -= 1
+        if self.online_users[user_id] <= 0:
+            del self.online_users[user_id]
+
+    def add_member(self, member: discord.Member, amount: int) -> None:
+        if member.guild.id not in self.guild_counts:
+            return
+        members, text, voice = self.guild_counts[member.guild.id]
+        self.guild_counts[member.guild.id] = (members + amount, text, voice)
+        self.total_members += amount
+
+    def add_channel(self, channel: discord.abc.GuildChannel, amount: int) -> None:
+        if channel.guild.id not in self.guild_counts:
+            return
+        members, text, voice = self.guild_counts[channel.guild.id]
+        if isinstance(channel, discord.TextChannel):
+            text += amount
+            self.text_channels += amount
+        elif isinstance(channel, discord.VoiceChannel):
+            voice += amount
+            self.voice_channels += amount
+        self.guild_counts[channel.guild.id] = (members, text, voice)
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild: discord.Guild) -> None:
+        self.add_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild) -> None:
+        self.add_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_unavailable(self, guild: discord.Guild) -> None:
+        self.remove_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        self.remove_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member) -> None:
+        self.add_member(member, 1)
+        if member.status is not discord.Status.offline:
+            self.online_users[member.id] += 1
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member) -> None:
+        self.add_member(member, -1)
+        if member.status is not discord.Status.offline:
+            self.set_offline(member.id)
+
+    @commands.Cog.listener()
+    async def on_member_update(
+        self, before: discord.Member, after: discord.Member
+    ) -> None:
+        # Status changes are dispatched as member updates before discord.py 2.0
+        was_offline = before.status is discord.Status.offline
+        is_offline = after.status is discord.Status.offline
+        if was_offline and not is_offline:
+            self.online_users[after.id] += 1
+        elif is_offline and not was_offline:
+            self.set_offline(after.id)
+
+    @commands.Cog.listener()
+    async def on_presence_update(
+        self, before: discord.Member, after: discord.Member
+    ) -> None:
+        await self.on_member_update(before, after)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel) -> None:
+        self.add_channel(channel, 1)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel) -> None:
+        self.add_channel(channel, -1)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(
+        self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel
+    ) -> None:
+        if type(before) is not type(after):
+            self.add_channel(before, -1)
+            self.add_channel(after, 1)
+
+    # ------ Statistics embed ------
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Return the statistics of this process, None where they are unknown.
+
+        Every cluster answers stats requests of the launcher with these.
+        """
+        # Users and presences are not known unless they are cached
+        members_cached = bool(self.bot.cache_options["member_cache_flags"].value)
+        # Sampled in the background, reading it here would block the event loop
+        sample = self.bot.sampler.latest
+        return {
+            "members": self.total_members,
+            "users": self.bot.user_count if members_cached else None,
+            "online": len(self.online_users) if self.bot.intents.presences else None,
+            "guilds": self.bot.guild_count,
+            "text_channels": self.text_channels,
+            "voice_channels": self.voice_channels,
+            "latency": self.bot.latency,
+            "cpu_percent": sample.cpu_percent if sample is not None else None,
+            "memory": sample.memory if sample is not None else None,
+        }
+
+    @staticmethod
+    def sum_statistics(clusters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Sum the statistics of the clusters which answered, averaging latency.
+
+        Users in guilds of several clusters are counted once per cluster.
+        """
+        answered = [stats for stats in clusters.values() if "error" not in stats]
+        if not answered:
+            return None
+        totals: Dict[str, Any] = {}
+        for key in answered[0]:
+            values = [stats[key] for stats in answered]
+            totals[key] = None if None in values else sum(values)
+        totals["latency"] /= len(answered)
+        return totals
+
+    def get_statistics_embed(
+        self,
+        stats: Optional[Dict[str, Any]] = None,
+        *,
+        clusters: Optional[Dict[str, Any]] = None,
+    ) -> discord.Embed:
+        if stats is None:
+            stats = self.get_statistics()
+
+        def show(value: Optional[int]) -> str:
+            return "n/a" if value is None else str(value)
 
-        total_guilds: int = self.bot.guild_count
         assert self.bot.ready_time is not None
         up_since: str = self.bot.ready_time.strftime("%d %b %y")
-        ping: int = self.bot.ping
-        with self.bot.process.oneshot():
-            cpu_usage: float = self.bot.process.cpu_percent()
-            ram_usage: float = self.bot.process.memory_full_info().uss / 2 ** 20
+        ping: int = round(stats["latency"] * 1000)
+        if stats["memory"] is not None:
+            process: str = f"{stats['memory'] / 2 ** 20:.2f} MiB"
+            if stats["cpu_percent"] is not None:
+                process = f"{stats['cpu_percent']}% CPU\n" + process
+        else:
+            process = "Not sampled yet"
 
         embed: discord.Embed = discord.Embed(
             colour=botto.config["MAIN_COLOUR"], timestamp=datetime.datetime.utcnow()
@@ -49,17 +215,17 @@ class Meta(commands.Cog):
         embed.add_field(
             name="Member Stats",
             value=(
-                f"{total_members} total members\n"
-                f"{total_users} unqiue users\n"
-                f"{total_online} users online"
+                f"{stats['members']} total members\n"
+                f"{show(stats['users'])} unqiue users\n"
+                f"{show(stats['online'])} users online"
             ),
         )
         embed.add_field(
             name="Guild Stats",
             value=(
-                f"{total_guilds} guilds\n"
-                f"{text_channels} text channels\n"
-                f"{voice_channels} voice channels"
+                f"{stats['guilds']} guilds\n"
+                f"{stats['text_channels']} text channels\n"
+                f"{stats['voice_channels']} voice channels"
             ),
         )
         embed.add_field(
@@ -75,8 +241,15 @@ class Meta(commands.Cog):
                 f"{self.bot.humanize_uptime(brief=True)}\n" f"(Since {up_since} UTC)"
             ),
         )
-        embed.add_field(name="Connection", value=f"{ping} ms current")
-        embed.add_field(name="Process", value=f"{cpu_usage}% CPU\n{ram_usage:.2f} MiB")
+        if clusters is None:
+            embed.add_field(name="Connection", value=f"{ping} ms current")
+        else:
+            answered = sum("error" not in each for each in clusters.values())
+            embed.add_field(
+                name="Connection",
+                value=f"{ping} ms average\n{answered}/{len(clusters)} clusters",
+            )
+        embed.add_field(name="Process", value=process)
 
         embed.set_thumbnail(url=self.bot.user.avatar_url)
 
@@ -85,7 +258,17 @@ class Meta(commands.Cog):
     @botto.command()
     async def botstats(self, ctx: botto.Context) -> None:
         """Show general statistics of the bot."""
-        embed: discord.Embed = self.get_statistics_embed()
+        if self.bot.ipc is None:
+            embed: discord.Embed = self.get_statistics_embed()
+        else:
+            # Counts of every cluster, summed
+            try:
+                clusters: Dict[str, Any] = await self.bot.ipc.request("stats")
+            except IPCError:
+                clusters = {str(self.bot.cluster_id): self.get_statistics()}
+            embed = self.get_statistics_embed(
+                self.sum_statistics(clusters), clusters=clusters
+            )
         await ctx.send(embed=embed)
 
     @botto.command()
@@ -98,6 +281,43 @@ class Meta(commands.Cog):
         """Show uptime of the bot."""
         await ctx.send(f"Online since **{self.bot.humanize_uptime()}** ago.")
 
+    @botto.group(invoke_without_command=True)
+    async def prefix(self, ctx: botto.Context) -> None:
+        """Show the command prefixes of this server."""
+        prefixes = self.bot.get_guild_prefixes(ctx.guild)
+        if not prefixes:
+            await ctx.send(f"My only command prefix is {ctx.me.mention}.")
+            return
+        await ctx.send(
+            f"My command prefixes are {ctx.me.mention} and "
+            + ", ".join(f"`{prefix}`" for prefix in prefixes)
+            + "."
+        )
+
+    @prefix.command(name="set")
+    @commands.guild_only()
+    @commands.has_permissions(manage_guild=True)
+    async def prefix_set(self, ctx: botto.Context, *prefixes: str) -> None:
+        """Set custom command prefixes for this server."""
+        if not prefixes:
+            await ctx.send("Please pass at least one prefix.")
+            return
+        if len(prefixes) > 10 or any(len(prefix) > 20 for prefix in prefixes):
+            await ctx.send("You can set up to 10 prefixes of up to 20 characters.")
+            return
+        await self.bot.set_guild_prefixes(ctx.guild.id, list(prefixes))
+        await ctx.send(
+            "Command prefixes set to " + ", ".join(f"`{p}`" for p in prefixes) + "."
+        )
+
+    @prefix.command(name="reset")
+    @commands.guild_only()
+    @commands.has_permissions(manage_guild=True)
+    async def prefix_reset(self, ctx: botto.Context) -> None:
+        """Reset the command prefixes of this server."""
+        await self.bot.set_guild_prefixes(ctx.guild.id, [])
+        await ctx.send("Command prefixes have been reset.")
+
     @botto.command()
     async def invite(self, ctx: botto.Context) -> None:
         """Show invite link of the bot."""
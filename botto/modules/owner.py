@@ -11,7 +11,7 @@ import textwrap
 import time
 from contextlib import redirect_stdout
 from subprocess import Popen, PIPE
-from typing import Any, Dict, List, Match, Optional, Tuple
+from typing import Any, BinaryIO, Dict, List, Match, Optional, Tuple
 
 import aiohttp
 import import_expression
@@ -20,9 +20,36 @@ import discord
 from discord.ext import commands
 
 import botto
+from botto.core.cache import cache_statistics
+from botto.core.ipc import IPCError
+from botto.core.metrics import PHASES
+from botto.core.sampler import sparkline
+from botto.utils.codestats import CodeStats
+from botto.utils.importtime import profile_imports, total_by_package
+from botto.utils.logs import export_range, log_file, tail_offset, time_offset
 
 actions_logger = logging.getLogger("botto.actions")
 
+# Discord's upload limit for bots outside of boosted guilds
+UPLOAD_LIMIT = 8 * 2 ** 20
+# Exports larger than this are gzipped
+GZIP_THRESHOLD = 2 ** 20
+
+RELATIVE_TIME_PATTERN = re.compile(r"(\d+)([smhd])")
+TIME_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+
+def log_time(argument: str) -> datetime.datetime:
+    """Converter for a local time, either in ISO format or relative like 2h ago."""
+    match = RELATIVE_TIME_PATTERN.fullmatch(argument)
+    if match is not None:
+        delta = datetime.timedelta(**{TIME_UNITS[match[2]]: int(match[1])})
+        return datetime.datetime.now() - delta
+    try:
+        return datetime.datetime.fromisoformat(argument)
+    except ValueError:
+        raise commands.BadArgument(f"Could not understand the time {argument!r}.")
+
 
 class Owner(commands.Cog, command_attrs=dict(hidden=True)):  # type: ignore
     """Developer and owner-only commands."""
@@ -30,6 +57,7 @@ class Owner(commands.Cog, command_attrs=dict(hidden=True)):  # type: ignore
     def __init__(self, bot: botto.Botto) -> None:
         self.bot: botto.Botto = bot
         self._last_result: Optional[Any] = None
+        self.code_stats: CodeStats = CodeStats()
 
     async def cog_check(self, ctx: botto.Context) -> bool:
         return await self.bot.is_owner(ctx.author)
@@ -135,16 +163,232 @@ class Owner(commands.Cog, command_attrs=dict(hidden=True)):  # type: ignore
     async def shutdown(self, ctx: botto.Context) -> None:
         """Disconnect the bot from Discord and ends its processes."""
         await ctx.send("Shutdown initiated.")
+        if self.bot.ipc is not None:
+            # The launcher stops every cluster, including this one, so its reply
+            # may never arrive
+            try:
+                self.bot.ipc.notify("shutdown")
+                return
+            except IPCError:
+                await ctx.send(
+                    "Not connected to the launcher, only stopping this cluster."
+                )
         await self.bot.logout()
 
+    @botto.group(invoke_without_command=True)
+    async def logs(self, ctx: botto.Context, lines: int = 100) -> None:
+        """DM the last lines of the bot logs."""
+        path: str = log_file("LOG_FILE", "botto.log", self.bot.cluster_id)
+
+        def export() -> Tuple[BinaryIO, bool]:
+            start, end = tail_offset(path, lines), os.path.getsize(path)
+            compress = end - start > GZIP_THRESHOLD
+            return export_range(path, start, end, compress=compress), compress
+
+        await self.send_logs(ctx, *await ctx.run_in_exec(export))
+
+    @logs.command(name="range")
+    async def logs_range(
+        self,
+        ctx: botto.Context,
+        since: log_time,  # type: ignore
+        until: Optional[log_time] = None,  # type: ignore
+    ) -> None:
+        """DM the bot logs between two times.
+
+        Times are either like 2020-01-31T12:00 or relative like 2h or 30m.
+        """
+        path: str = log_file("LOG_FILE", "botto.log", self.bot.cluster_id)
+
+        def export() -> Tuple[BinaryIO, bool]:
+            start = time_offset(path, since)
+            end = time_offset(path, until) if until else os.path.getsize(path)
+            compress = end - start > GZIP_THRESHOLD
+            return export_range(path, start, end, compress=compress), compress
+
+        await self.send_logs(ctx, *await ctx.run_in_exec(export))
+
+    async def send_logs(
+        self, ctx: botto.Context, file: BinaryIO, compressed: bool
+    ) -> None:
+        with file:
+            size: int = file.seek(0, os.SEEK_END)
+            file.seek(0)
+            if size > UPLOAD_LIMIT:
+                await ctx.send(
+                    f"The logs are {size / 2 ** 20:.1f} MiB even compressed, "
+                    "try a shorter range."
+                )
+                return
+            timestamp: str = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+            filename: str = f"botto-{timestamp}.log" + (".gz" if compressed else "")
+            await ctx.author.send(file=discord.File(file, filename))
+        await ctx.message.add_reaction("\N{OPEN MAILBOX WITH RAISED FLAG}")
+
+    @botto.command()
+    async def messagestats(self, ctx: botto.Context) -> None:
+        """Show how many messages were rejected before command processing."""
+        stats = self.bot.message_stats
+        total: int = sum(stats.values())
+        lines: List[str] = [
+            f"{reason}: {count} ({count / total:.1%})"
+            for reason, count in stats.most_common()
+        ]
+        await ctx.send("```\n" + "\n".join(lines or ["No messages yet."]) + "\n```")
+
+    @botto.command()
+    async def metrics(
+        self, ctx: botto.Context, *, command: Optional[str] = None
+    ) -> None:
+        """Show latency percentiles of commands, or per phase for one command."""
+        commands_metrics = self.bot.metrics.commands
+        if command is not None:
+            metrics = commands_metrics.get(command)
+            if metrics is None:
+                await ctx.send(f"No metrics for `{command}` yet.")
+                return
+            lines: List[str] = [
+                f"{command}: {metrics.invocations} calls, "
+                f"{metrics.error_rate:.1%} errors",
+                f"{'phase':<6} {'p50':>9} {'p90':>9} {'p99':>9}",
+            ]
+            for phase in PHASES:
+                p50, p90, p99 = (value * 1000 for value in metrics.quantiles(phase))
+                lines.append(f"{phase:<6} {p50:7.1f}ms {p90:7.1f}ms {p99:7.1f}ms")
+        else:
+            lines = [
+                f"{'command':<20} {'calls':>6} {'errors':>7} {'p50':>9} {'p99':>9}"
+            ]
+            for name, metrics in sorted(
+                commands_metrics.items(), key=lambda item: -item[1].invocations
+            ):
+                p50, _, p99 = (value * 1000 for value in metrics.quantiles("total"))
+                lines.append(
+                    f"{name:<20} {metrics.invocations:>6} {metrics.error_rate:>7.1%} "
+                    f"{p50:7.1f}ms {p99:7.1f}ms"
+                )
+        await ctx.send("```\n" + "\n".join(lines) + "\n```")
+
+    @botto.command()
+    async def querystats(self, ctx: botto.Context, count: int = 10) -> None:
+        """Show the database statements which took the most time in total."""
+        profiler = self.bot.query_profiler
+        lines: List[str] = []
+        for statement, stats in profiler.top(count):
+            lines.append(
+                f"{stats.total * 1000:.0f}ms total, {stats.calls} calls, "
+                f"{stats.mean * 1000:.1f}ms mean, {stats.max * 1000:.1f}ms max, "
+                f"{stats.rows} rows\n  {textwrap.shorten(statement, 300)}"
+            )
+        if profiler.pool_waits:
+            lines.append(
+                f"Pool waits: {profiler.pool_waits}, "
+                f"{profiler.pool_wait_total / profiler.pool_waits * 1000:.2f}ms mean, "
+                f"{profiler.pool_wait_max * 1000:.1f}ms max"
+            )
+        paginator = commands.Paginator()
+        for line in lines or ["No queries yet."]:
+            paginator.add_line(line)
+        for page in paginator.pages:
+            await ctx.send(page)
+
+    @botto.command(aliases=["procstats"])
+    async def processstats(self, ctx: botto.Context, count: int = 60) -> None:
+        """Show the recent history of process statistics as sparklines."""
+        sampler = self.bot.sampler
+        if not sampler.samples:
+            await ctx.send("No samples yet.")
+            return
+        lines: List[str] = [
+            f"Last {min(count, len(sampler.samples))} samples, "
+            f"{sampler.interval:g} seconds apart"
+        ]
+        for name, label, scale, unit in (
+            ("cpu_percent", "CPU", 1, "%"),
+            ("uss", "USS", 2 ** 20, " MiB"),
+            ("rss", "RSS", 2 ** 20, " MiB"),
+            ("fds", "FDs", 1, ""),
+            ("threads", "Threads", 1, ""),
+            ("loop_lag", "Loop lag", 1e-3, " ms"),
+            ("gc_collections", "GC runs", 1, ""),
+        ):
+            values = [value / scale for value in sampler.history(name, count)]
+            if not values:
+                continue
+            lines.append(
+                f"{label:<8} {sparkline(values)} {values[-1]:.1f}{unit} "
+                f"(min {min(values):.1f}, max {max(values):.1f})"
+            )
+        await ctx.send("```\n" + "\n".join(lines) + "\n```")
+
     @botto.command()
-    async def logs(self, ctx: botto.Context) -> None:
-        """DM bot logs."""
-        with open("botto.log") as file:
-            content: str = file.read()
-            mystbin: str = await ctx.mystbin(content)
-            await ctx.author.send(f"Logs: {mystbin}")
-            await ctx.message.add_reaction("\N{OPEN MAILBOX WITH RAISED FLAG}")
+    async def loopstats(self, ctx: botto.Context, count: int = 10) -> None:
+        """Show event loop lag and the callbacks which blocked it the longest."""
+        monitor = self.bot.loop_monitor
+        lines: List[str] = [
+            f"Lag: {monitor.lag * 1000:.1f} ms, {monitor.stalls} stalls "
+            f"totalling {monitor.stalled_time:.2f} s "
+            f"(threshold {monitor.threshold * 1000:.0f} ms)"
+        ]
+        for location, offender in monitor.top(count):
+            lines.append(
+                f"{offender.total * 1000:.0f}ms total, {offender.count} stalls, "
+                f"{offender.max * 1000:.0f}ms max\n  {location}"
+            )
+        await ctx.send("```\n" + "\n".join(lines) + "\n```")
+
+    @botto.command()
+    async def sessions(self, ctx: botto.Context) -> None:
+        """Show the number of active interactive sessions by kind."""
+        registry = self.bot.sessions
+        lines: List[str] = [
+            f"{kind}: {count}" for kind, count in registry.counts().most_common()
+        ]
+        lines.append(
+            f"{len(registry)} sessions, {registry.expired} expired, "
+            f"{registry.memory_usage() / 1024:.1f} KiB"
+        )
+        await ctx.send("```\n" + "\n".join(lines) + "\n```")
+
+    @botto.command()
+    async def cachestats(self, ctx: botto.Context) -> None:
+        """Show what is cached under the cache profile and the memory saved."""
+        # The gateway changes the caches on the loop, so they are only read there
+        stats = cache_statistics(self.bot)
+        await ctx.send(
+            f"```\nProfile: {botto.config.get('CACHE_PROFILE', 'full')}\n"
+            f"Guilds: {stats['guilds']}\n"
+            f"Members: {stats['members_cached']} of {stats['members_total']} cached, "
+            f"~{stats['member_size']} bytes each\n"
+            f"Users: {stats['users_cached']}\n"
+            f"Messages: {stats['messages_cached']}\n"
+            f"Saved: ~{stats['saved_bytes'] / 2 ** 20:.1f} MiB\n```"
+        )
+
+    @botto.command()
+    async def importtime(self, ctx: botto.Context, count: int = 15) -> None:
+        """Show what takes the longest to import at startup, in a new interpreter."""
+        modules: List[str] = ["botto", *botto.config["STARTUP_MODULES"]]
+        async with ctx.typing():
+            times = await ctx.run_in_exec(profile_imports, modules)
+        packages = sorted(
+            total_by_package(times).items(), key=lambda item: item[1], reverse=True
+        )
+        slowest = sorted(times, key=lambda entry: entry.cumulative_us, reverse=True)
+        total_ms = (
+            sum(entry.cumulative_us for entry in times if entry.depth == 0) / 1000
+        )
+        lines: List[str] = [f"{len(times)} modules imported in {total_ms:.0f} ms", ""]
+        lines.append(f"{'Package':<30} {'Self':>9}")
+        for package, self_us in packages[:count]:
+            lines.append(f"{package:<30} {self_us / 1000:>6.1f} ms")
+        lines.extend(["", f"{'Module':<30} {'Self':>9} {'Cumulative':>11}"])
+        for entry in slowest[:count]:
+            lines.append(
+                f"{botto.utils.limit_str(entry.module, 30):<30} "
+                f"{entry.self_us / 1000:>6.1f} ms {entry.cumulative_us / 1000:>8.1f} ms"
+            )
+        await ctx.send("```\n" + "\n".join(lines) + "```")
 
     @botto.command(aliases=["runas"])
     async def pseudo(
@@ -166,29 +410,37 @@ class Owner(commands.Cog, command_attrs=dict(hidden=True)):  # type: ignore
     @botto.command()
     async def load(self, ctx: botto.Context, module: str) -> None:
         """Load a module."""
-        if not module.startswith("botto.modules."):
-            module = f"botto.modules.{module}"
-
-        self.bot.load_extension(module)
-        await ctx.send(f"Successfully loaded '{module}' module.")
+        await self.manage_module(ctx, "load", module)
 
     @botto.command()
     async def unload(self, ctx: botto.Context, module: str) -> None:
         """Unload a module."""
-        if not module.startswith("botto.modules."):
-            module = f"botto.modules.{module}"
-
-        self.bot.unload_extension(module)
-        await ctx.send(f"Successfully unloaded '{module}' module.")
+        await self.manage_module(ctx, "unload", module)
 
     @botto.command()
     async def reload(self, ctx: botto.Context, module: str) -> None:
         """Reload a module."""
+        await self.manage_module(ctx, "reload", module)
+
+    async def manage_module(self, ctx: botto.Context, action: str, module: str) -> None:
+        """Load, unload or reload a module, in every cluster if run by the launcher."""
         if not module.startswith("botto.modules."):
             module = f"botto.modules.{module}"
 
-        self.bot.reload_extension(module)
-        await ctx.send(f"Successfully reloaded '{module}' module.")
+        if self.bot.ipc is None:
+            getattr(self.bot, f"{action}_extension")(module)
+            await ctx.send(f"Successfully {action}ed '{module}' module.")
+            return
+
+        results: Dict[str, Any] = await self.bot.ipc.request(action, name=module)
+        lines: List[str] = [
+            f"Cluster {cluster_id}: "
+            + (result["error"] if result and "error" in result else "OK")
+            for cluster_id, result in sorted(results.items(), key=lambda i: int(i[0]))
+        ]
+        await ctx.send(
+            f"{action.title()}ed '{module}' module.\n```\n" + "\n".join(lines) + "```"
+        )
 
     # ------ Profile editing ------
 
@@ -235,23 +487,32 @@ class Owner(commands.Cog, command_attrs=dict(hidden=True)):  # type: ignore
     @botto.command()
     async def codestats(self, ctx: botto.Context) -> None:
         """Show code statistics of the bot."""
-        lines: Dict[str, int] = {"py": 0}
-
-        for root, _, files in os.walk("."):
-            if any(path in root for path in [".git", "__pycache__", "venv"]):
-                continue
-
-            for filename in files:
-                if not filename.endswith(tuple(f".{ext}" for ext in lines)):
-                    continue
-
-                f_ext: str = filename.split(".")[-1]
-                with open(os.path.join(root, filename), encoding="utf-8") as file:
-                    lines[f_ext] += sum(1 for line in file.readlines() if line != "\n")
-
-                await asyncio.sleep(0)
-
-        await ctx.send(f"{lines['py']} lines of Python code written.")
+        # Top level directories are scanned in parallel in the io executor
+        directories: List[str] = await ctx.run_in_exec(
+            self.code_stats.subdirectories, "."
+        )
+        results = await asyncio.gather(
+            ctx.run_in_exec(self.code_stats.scan, ".", False),
+            *(ctx.run_in_exec(self.code_stats.scan, path) for path in directories),
+        )
+        totals: Dict[str, List[int]] = {}
+        for result in results:
+            for language, (files, lines) in result.items():
+                counts = totals.setdefault(language, [0, 0])
+                counts[0] += files
+                counts[1] += lines
+
+        python_lines: int = totals.get("Python", [0, 0])[1]
+        breakdown: List[str] = [
+            f"{language}: {lines} lines in {files} files"
+            for language, (files, lines) in sorted(
+                totals.items(), key=lambda item: -item[1][1]
+            )
+        ]
+        await ctx.send(
+            f"{python_lines} lines of Python code written.\n"
+            "```\n" + "\n".join(breakdown) + "\n```"
+        )
 
     # ------ Eval commands ------
 
@@ -267,7 +528,7 @@ class Owner(commands.Cog, command_attrs=dict(hidden=True)):  # type: ignore
         command = self._cleanup_code(command)
         argv: List[str] = shlex.split(command)
         start: float = time.perf_counter()
-        stdout, stderr = await self.bot.loop.run_in_executor(None, run_shell, argv)
+        stdout, stderr = await ctx.run_in_exec(run_shell, argv)
         delta: float = (time.perf_counter() - start) * 1000
         timestamp: datetime.datetime = ctx.message.created_at
         await ctx.message.remove_reaction(botto.aLOADING, ctx.me)
@@ -1,8 +1,7 @@
 import asyncio
 import random
-from typing import Dict, List, Optional
+from typing import List, Optional
 
-import asyncpg  # type: ignore
 import discord  # type: ignore
 from discord.ext import commands  # type: ignore
 
@@ -71,16 +70,57 @@ to_hiragana = lambda kana: HIRAGANA_SYLLABLES[KATAKANA_SYLLABLES.index(kana)]
 to_katakana = lambda kana: KATAKANA_SYLLABLES[HIRAGANA_SYLLABLES.index(kana)]
 
 
+IS_NOUN_QUERY = """
+SELECT EXISTS(
+    SELECT
+        1
+    FROM
+        "JMdict_ReadingSense" AS rs
+        INNER JOIN "JMdict_Sense" AS s
+            ON rs.entry_id = s.entry_id
+            AND rs.sense_index = s.index
+    WHERE
+        rs.reading_literal = :word
+        AND 'noun (common) (futsuumeishi)' = ANY(s.parts_of_speech)
+    LIMIT 1
+);
+"""
+
+NEXT_WORD_QUERY = """
+SELECT
+    (rs.reading_literal, rw.writing_literal)
+FROM
+    "JMdict_ReadingSense" AS rs
+    INNER JOIN "JMdict_Sense" AS s
+        ON rs.entry_id = s.entry_id
+        AND rs.sense_index = s.index
+    LEFT JOIN "JMdict_ReadingWriting" AS rw
+        ON rs.entry_id = rw.entry_id
+        AND rs.reading_literal = rw.reading_literal
+WHERE
+    rs.entry_id > :start_id
+    AND rs.reading_literal ~ :pattern
+    AND NOT rs.reading_literal = ANY(:used_words)
+    AND 'noun (common) (futsuumeishi)' = ANY(s.parts_of_speech)
+LIMIT :limit;
+"""
+
+
 class Shiritori(commands.Cog):
+
+    # Statements of a turn, prepared on each pooled connection by Botto.warm_up_pool
+    warm_up_queries = [
+        (IS_NOUN_QUERY, dict(word="")),
+        (NEXT_WORD_QUERY, dict(start_id=0, pattern="", used_words=[], limit=0)),
+    ]
+
     def __init__(self, bot: botto.Botto) -> None:
         self.bot: botto.Botto = bot
-        self.sessions: Dict[discord.User, asyncio.Task] = {}
         self.total_nouns = 150000
         self.bot.loop.create_task(self.get_total_nouns())
 
-    def __unload(self) -> None:
-        for task in self.sessions.values():
-            task.cancel()
+    def cog_unload(self) -> None:
+        self.bot.sessions.end_all("shiritori")
 
     async def get_total_nouns(self) -> None:
         self.total_nouns = await self.bot.db.scalar(
@@ -97,28 +137,7 @@ class Shiritori(commands.Cog):
         )
 
     async def check_is_noun(self, word: str) -> bool:
-        try:
-            return await self.bot.db.scalar(
-                """
-                SELECT EXISTS(
-                    SELECT
-                        1
-                    FROM
-                        "JMdict_ReadingSense" AS rs
-                        INNER JOIN "JMdict_Sense" AS s
-                            ON rs.entry_id = s.entry_id
-                            AND rs.sense_index = s.index
-                    WHERE
-                        rs.reading_literal = '{}'
-                        AND 'noun (common) (futsuumeishi)' = ANY(s.parts_of_speech)
-                    LIMIT 1
-                );
-                """.format(
-                    word
-                )
-            )
-        except asyncpg.PostgresSyntaxError:
-            return False
+        return await self.bot.db.scalar(self.bot.db.text(IS_NOUN_QUERY), word=word)
 
     async def get_next_word(
         self, kana_a: str, kana_b: str, used_words: Optional[List[str]] = None
@@ -134,35 +153,17 @@ class Shiritori(commands.Cog):
             regex_strategy = f"^[{kana_a}{kana_b}][^{SUTEGANA}].*[^んン]$"
 
         return await self.bot.db.scalar(
-            """
-            SELECT
-                (rs.reading_literal, rw.writing_literal)
-            FROM
-                "JMdict_ReadingSense" AS rs
-                INNER JOIN "JMdict_Sense" AS s
-                    ON rs.entry_id = s.entry_id
-                    AND rs.sense_index = s.index
-                LEFT JOIN "JMdict_ReadingWriting" AS rw
-                    ON rs.entry_id = rw.entry_id
-                    AND rs.reading_literal = rw.reading_literal
-            WHERE
-                rs.entry_id > {}
-                AND rs.reading_literal ~ '{}'
-                AND NOT rs.reading_literal = ANY(ARRAY[{}]::text[])
-                AND 'noun (common) (futsuumeishi)' = ANY(s.parts_of_speech)
-            LIMIT 1;
-            """.format(
-                random.randint(1000000, 2000000),
-                regex_strategy,
-                ", ".join(repr(s) for s in used_words),
-            )
+            self.bot.db.text(NEXT_WORD_QUERY),
+            start_id=random.randint(1000000, 2000000),
+            pattern=regex_strategy,
+            used_words=used_words,
+            limit=1,
         )
 
     @botto.group(aliases=["しりとり", "尻取り"], invoke_without_command=True)
     async def shiritori(self, ctx: botto.Context, time_limit: int = 20) -> None:
         """Play Shiritori with Tango!"""
-        if ctx.author in self.sessions:
-            self.sessions.pop(ctx.author).cancel()
+        self.bot.sessions.end(ctx.author.id, ctx.channel.id)
         if time_limit < 5:
             await ctx.send("I don't support speedtyping! Try five seconds and above.")
             return
@@ -190,9 +191,15 @@ class Shiritori(commands.Cog):
 
         await ctx.send(f"{botto.BLOBFISTBUMP} {ctx.author.mention} Starting off, しりとり!")
 
-        self.sessions[ctx.author] = self.bot.loop.create_task(
-            self.continue_shiritori(ctx, time_limit)
+        task = self.bot.loop.create_task(self.continue_shiritori(ctx, time_limit))
+        session = self.bot.sessions.start(
+            ctx.author.id,
+            ctx.channel.id,
+            "shiritori",
+            timeout=time_limit * 2,
+            task=task,
         )
+        task.add_done_callback(lambda _: self.bot.sessions.end_session(session))
 
     @shiritori.help_embed
     async def shiritori_help_embed(self, help_command) -> discord.Embed:
@@ -264,6 +271,10 @@ class Shiritori(commands.Cog):
                     )
                 return
             used_words = await self.process_turn(ctx, msg.content, used_words)
+            # Games which stop taking turns without timing out still expire
+            session = self.bot.sessions.get(ctx.author.id, ctx.channel.id)
+            if session is not None:
+                self.bot.sessions.touch(session, timeout * 2)
 
     async def process_turn(
         self, ctx: botto.Context, word: str, used_words: List[str]
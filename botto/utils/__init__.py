@@ -6,7 +6,8 @@ from typing import Any, List, Match, Optional, Tuple, Union
 
 import discord
 
-from .paginator import EmbedPaginator
+from .paginator import EmbedPaginator, PaginatorRegistry
+from .timerwheel import TimerWheel
 
 AnyChannel = Union[
     discord.TextChannel,
@@ -0,0 +1,84 @@
+import os
+from typing import Dict, Iterator, List, Tuple
+
+# File extension to the name of the language it is counted as
+LANGUAGES: Dict[str, str] = {
+    ".py": "Python",
+    ".pyi": "Python",
+    ".sql": "SQL",
+    ".yml": "YAML",
+    ".yaml": "YAML",
+    ".toml": "TOML",
+    ".cfg": "Config",
+    ".ini": "Config",
+    ".sh": "Shell",
+    ".md": "Markdown",
+    ".rst": "reStructuredText",
+}
+
+# Directories which are never descended into, resources/data alone holds tens of
+# thousands of stroke order SVGs and GIFs
+PRUNED_DIRECTORIES = frozenset(
+    {
+        ".git",
+        ".mypy_cache",
+        ".pytest_cache",
+        ".tox",
+        ".venv",
+        "__pycache__",
+        "build",
+        "dist",
+        "node_modules",
+        "resources",
+        "venv",
+    }
+)
+
+
+class CodeStats:
+    """Count non-blank lines of source files, caching counts by mtime and size."""
+
+    def __init__(self) -> None:
+        # Path to (mtime_ns, size, lines)
+        self.cache: Dict[str, Tuple[int, int, int]] = {}
+
+    def iter_files(self, path: str, recursive: bool = True) -> Iterator[os.DirEntry]:
+        """Yield source files in a directory, pruning before descending."""
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and entry.name not in PRUNED_DIRECTORIES:
+                        yield from self.iter_files(entry.path)
+                elif os.path.splitext(entry.name)[1] in LANGUAGES:
+                    yield entry
+
+    @staticmethod
+    def subdirectories(path: str) -> List[str]:
+        """Return the directories in a directory which are not pruned."""
+        with os.scandir(path) as entries:
+            return [
+                entry.path
+                for entry in entries
+                if entry.is_dir(follow_symlinks=False)
+                and entry.name not in PRUNED_DIRECTORIES
+            ]
+
+    def count_lines(self, entry: os.DirEntry) -> int:
+        stat = entry.stat()
+        cached = self.cache.get(entry.path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        with open(entry.path, "rb") as file:
+            lines = sum(1 for line in file if line.strip())
+        self.cache[entry.path] = (stat.st_mtime_ns, stat.st_size, lines)
+        return lines
+
+    def scan(self, path: str, recursive: bool = True) -> Dict[str, List[int]]:
+        """Return language names to [files, lines] for a directory. Blocking."""
+        totals: Dict[str, List[int]] = {}
+        for entry in self.iter_files(path, recursive):
+            language = LANGUAGES[os.path.splitext(entry.name)[1]]
+            counts = totals.setdefault(language, [0, 0])
+            counts[0] += 1
+            counts[1] += self.count_lines(entry)
+        return totals
@@ -0,0 +1,154 @@
+"""Linear time layout of help-like embeds.
+
+Fields are packed greedily while keeping running character counts, instead of
+joining strings and calling len(embed) after every field.
+
+Run this module to benchmark it against the previous approach:
+    python -m botto.utils.embed_layout [number of commands]
+"""
+
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import discord
+
+FIELD_VALUE_LIMIT = 1024
+EMBED_LIMIT = 6000
+MAX_FIELDS = 25
+
+Field = Tuple[str, str]
+
+
+def pack_lines(
+    lines: Sequence[str], limit: int = FIELD_VALUE_LIMIT
+) -> List[Tuple[int, int]]:
+    """Group lines into as few newline-joined chunks of at most limit characters.
+
+    Return (start, stop) index pairs of the chunks. A line longer than the limit
+    gets a chunk of its own.
+    """
+    chunks: List[Tuple[int, int]] = []
+    start = 0
+    size = -1  # The first line of a chunk has no newline before it
+    for i, line in enumerate(lines):
+        added = len(line) + 1
+        if i > start and size + added > limit:
+            chunks.append((start, i))
+            start = i
+            size = -1
+        size += added
+    if start < len(lines):
+        chunks.append((start, len(lines)))
+    return chunks
+
+
+def make_fields(
+    title: str, lines: Sequence[str], limit: int = FIELD_VALUE_LIMIT
+) -> List[Field]:
+    """Split lines into fields named like "title (1-12/30)" when there are many."""
+    chunks = pack_lines(lines, limit)
+    if len(chunks) == 1:
+        return [(title, "\n".join(lines))]
+    return [
+        (f"{title} ({start + 1}-{stop}/{len(lines)})", "\n".join(lines[start:stop]))
+        for start, stop in chunks
+    ]
+
+
+class EmbedPacker:
+    """Greedily add fields to embeds, starting a new embed when one is full.
+
+    Parameters
+    ------------
+    factory: Callable[[], discord.Embed]
+        Creates the embeds after the first one.
+    first: Optional[discord.Embed]
+        The embed to add fields to first, created with factory if not given.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], discord.Embed],
+        *,
+        first: Optional[discord.Embed] = None,
+        limit: int = EMBED_LIMIT,
+    ) -> None:
+        self.factory = factory
+        self.limit = limit
+        self.embeds: List[discord.Embed] = []
+        self._size: int = 0
+        self._fields: int = 0
+        self._add_embed(first if first is not None else factory())
+
+    def _add_embed(self, embed: discord.Embed) -> None:
+        self.embeds.append(embed)
+        self._size = len(embed)  # The only full count, once per embed
+        self._fields = len(embed.fields)
+
+    def add_field(self, *, name: str, value: str, inline: bool = False) -> None:
+        size = len(name) + len(value)
+        if self._fields and (
+            self._size + size > self.limit or self._fields >= MAX_FIELDS
+        ):
+            self._add_embed(self.factory())
+        self.embeds[-1].add_field(name=name, value=value, inline=inline)
+        self._size += size
+        self._fields += 1
+
+    def add_fields(self, fields: Sequence[Field], *, inline: bool = False) -> None:
+        for name, value in fields:
+            self.add_field(name=name, value=value, inline=inline)
+
+
+def _quadratic_fields(lines: Sequence[str]) -> List[Field]:
+    # The previous approach, which rejoined the chunk for every line
+    fields: List[Field] = []
+    last_start_index = 0
+    last_content: List[str] = []
+    for i, content in enumerate(lines):
+        if len("\n".join(last_content + [content])) <= FIELD_VALUE_LIMIT:
+            last_content.append(content)
+        else:
+            fields.append(
+                (f"Commands ({last_start_index + 1}-{i})", "\n".join(last_content))
+            )
+            last_start_index = i
+            last_content = [content]
+    fields.append(
+        (f"Commands ({last_start_index + 1}-{len(lines)})", "\n".join(last_content))
+    )
+    return fields
+
+
+def _benchmark(count: int = 500, repeat: int = 20) -> None:
+    import timeit
+
+    lines = [f"`t command{i}` — Synthetic command number {i}." for i in range(count)]
+
+    def old() -> List[discord.Embed]:
+        embeds = [discord.Embed()]
+        for name, value in _quadratic_fields(lines):
+            before = embeds[-1].copy()
+            embeds[-1].add_field(name=name, value=value, inline=False)
+            if len(embeds[-1]) > EMBED_LIMIT or len(embeds[-1].fields) > MAX_FIELDS:
+                embeds[-1] = before
+                embeds.append(discord.Embed())
+                embeds[-1].add_field(name=name, value=value, inline=False)
+        return embeds
+
+    def new() -> List[discord.Embed]:
+        packer = EmbedPacker(discord.Embed)
+        packer.add_fields(make_fields("Commands", lines))
+        return packer.embeds
+
+    for name, func in (("previous", old), ("embed_layout", new)):
+        seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+        print(
+            f"{name:>12}: {seconds * 1000:8.3f} ms for {count} commands "
+            f"({len(func())} embeds)"
+        )
+
+
+if __name__ == "__main__":
+    import sys
+
+    _benchmark(*(int(arg) for arg in sys.argv[1:2]))
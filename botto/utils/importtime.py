@@ -0,0 +1,76 @@
+import re
+import subprocess
+import sys
+from typing import Dict, Iterable, List
+
+# Lines of python -X importtime, like "import time:  1021 |  4530 |   discord.http"
+LINE_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+
+class ImportTime:
+    """Time taken to import a module, in microseconds."""
+
+    __slots__ = ("module", "self_us", "cumulative_us", "depth")
+
+    def __init__(
+        self, module: str, self_us: int, cumulative_us: int, depth: int
+    ) -> None:
+        self.module: str = module
+        # Excluding and including the modules it imported
+        self.self_us: int = self_us
+        self.cumulative_us: int = cumulative_us
+        # 0 for modules imported directly, 1 for the modules they import, ...
+        self.depth: int = depth
+
+    @property
+    def package(self) -> str:
+        return self.module.split(".", 1)[0]
+
+
+def parse_importtime(output: str) -> List[ImportTime]:
+    times: List[ImportTime] = []
+    for line in output.splitlines():
+        match = LINE_PATTERN.match(line)
+        if match is None:
+            continue
+        indent = len(match.group(3))
+        times.append(
+            ImportTime(
+                match.group(4),
+                int(match.group(1)),
+                int(match.group(2)),
+                # Nested imports are indented by two more spaces per level
+                (indent - 1) // 2,
+            )
+        )
+    return times
+
+
+def profile_imports(modules: Iterable[str], timeout: float = 120.0) -> List[ImportTime]:
+    """Import modules in a new interpreter with -X importtime. Blocking.
+
+    Modules already imported by the interpreter at startup are not included.
+    """
+    code = "import importlib\n" + "".join(
+        f"importlib.import_module({module!r})\n" for module in modules
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        timeout=timeout,
+        check=False,
+    )
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f"Exited with {result.returncode}.")
+    return parse_importtime(result.stderr)
+
+
+def total_by_package(times: Iterable[ImportTime]) -> Dict[str, int]:
+    """Return top-level package names to the microseconds spent importing them."""
+    totals: Dict[str, int] = {}
+    for entry in times:
+        totals[entry.package] = totals.get(entry.package, 0) + entry.self_us
+    return totals
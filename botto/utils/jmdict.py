@@ -1,27 +1,114 @@
-from typing import BinaryIO, Dict, Generator, List, Tuple, Union
+import asyncio
+import re
+import sys
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Tuple,
+    Union,
+)
 
-from lxml import etree  # type: ignore
+from gino import Gino  # type: ignore
+from sqlalchemy.schema import CreateIndex  # type: ignore
 
+import botto
+from botto.core.bot import Botto
 from botto.core.models.jmdict import (
     Entry,
     WritingElement,
     ReadingElement,
     Sense,
     Gloss,
+    GlossToken,
     LSource,
     ReadingWriting,
     ReadingSense,
     WritingSense,
 )
 
+# lxml is only needed to parse the dictionary, not to tokenize search queries
+if TYPE_CHECKING:
+    from lxml import etree  # type: ignore
+
 XMLNS: str = "{http://www.w3.org/XML/1998/namespace}"
 
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Words too frequent in glosses to be useful on their own (eg. "to eat")
+STOPWORDS = frozenset({"a", "an", "the", "to", "of", "be", "one's"})
+
+# Tiers of <ke_pri>/<re_pri> tags, the "nfxx" frequency ranks refine the first tier
+PRIORITY_TIERS: Dict[str, int] = {
+    "news1": 0,
+    "ichi1": 0,
+    "spec1": 0,
+    "spec2": 0,
+    "gai1": 0,
+    "news2": 1,
+    "ichi2": 1,
+    "gai2": 1,
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Split English text into normalised tokens used by the gloss index."""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    return [token for token in dict.fromkeys(tokens) if token not in STOPWORDS]
+
+
+def priority_rank(priorities: Iterable[str]) -> int:
+    """Rank a set of priority tags, lower ranks are more common words.
+
+    Tier 0 words rank 1-49 by their "nfxx" frequency, tier 1 ranks 50 and
+    words without priority tags rank 100.
+    """
+    tier = 2
+    frequency = 49
+    for tag in priorities:
+        tier = min(tier, PRIORITY_TIERS.get(tag, 2))
+        if tag.startswith("nf"):
+            frequency = min(frequency, int(tag[2:]))
+    if tier == 0:
+        return frequency
+    return tier * 50
+
+
+def index_gloss(
+    gloss_tokens: Dict[Tuple[str, int], GlossToken],
+    entry_id: int,
+    sense_index: int,
+    rank: int,
+    text: str,
+) -> None:
+    """Add the tokens of an English gloss of an entry's sense to its postings.
+
+    A token in several glosses of a sense keeps the length of the shortest one.
+    """
+    tokens = tokenize(text)
+    for token in tokens:
+        posting = gloss_tokens.get((token, sense_index))
+        if posting is None:
+            gloss_tokens[(token, sense_index)] = GlossToken(
+                token=token,
+                entry_id=entry_id,
+                sense_index=sense_index,
+                rank=rank,
+                length=len(tokens),
+            )
+        elif len(tokens) < posting.length:
+            posting.length = len(tokens)
 
-def _get_child(node: etree._Element, tag: str) -> etree._Element:
+
+def _get_child(node: "etree._Element", tag: str) -> "etree._Element":
     return next(node.iter(tag))
 
 
-def _has_child(node: etree._Element, tag: str) -> bool:
+def _has_child(node: "etree._Element", tag: str) -> bool:
     try:
         _get_child(node, tag)
     except StopIteration:
@@ -29,7 +116,7 @@ def _has_child(node: etree._Element, tag: str) -> bool:
     return True
 
 
-def _parse_node(entry_node: etree._Element) -> Tuple[Entry, dict]:
+def _parse_node(entry_node: "etree._Element") -> Tuple[Entry, dict]:
     entry_id: int = int(_get_child(entry_node, "ent_seq").text)
 
     # ALl model instances
@@ -41,6 +128,7 @@ def _parse_node(entry_node: etree._Element) -> Tuple[Entry, dict]:
     senses: List[Sense] = []
     lsources: List[LSource] = []
     glosses: List[Gloss] = []
+    gloss_tokens: Dict[Tuple[str, int], GlossToken] = {}
     writings_senses: List[WritingSense] = []
     readings_senses: List[ReadingSense] = []
 
@@ -82,6 +170,10 @@ def _parse_node(entry_node: etree._Element) -> Tuple[Entry, dict]:
 
     reading_elements.extend(reading_writings_mapping)
 
+    rank: int = priority_rank(
+        tag for elem in writing_elements + reading_elements for tag in elem.priority
+    )
+
     # Creating ReadingWriting relational instances.
     for reading_elem, writing_literals in reading_writings_mapping.items():
         reading_writing = [
@@ -155,6 +247,9 @@ def _parse_node(entry_node: etree._Element) -> Tuple[Entry, dict]:
                 )
             )
 
+            if gloss_node.text is not None and glosses[-1].lang == "eng":
+                index_gloss(gloss_tokens, entry_id, sense_index, rank, gloss_node.text)
+
         if _has_child(sense_node, "stagk"):
             related_writings = [k.text for k in sense_node.iter("stagk")]
         else:
@@ -192,6 +287,7 @@ def _parse_node(entry_node: etree._Element) -> Tuple[Entry, dict]:
             "senses": senses,
             "lsources": lsources,
             "glosses": glosses,
+            "gloss_tokens": list(gloss_tokens.values()),
             "writings_senses": writings_senses,
             "readings_senses": readings_senses,
         },
@@ -199,6 +295,140 @@ def _parse_node(entry_node: etree._Element) -> Tuple[Entry, dict]:
 
 
 def parse(filepath: Union[BinaryIO, str]) -> Generator[Tuple[Entry, dict], None, None]:
+    from lxml import etree  # pylint: disable=redefined-outer-name
+
     tree = etree.parse(filepath)
     for node in tree.getroot().iter("entry"):
         yield _parse_node(node)
+
+
+# ------ Database ------
+
+# In the order rows are inserted, so foreign keys are satisfied
+MODELS: Tuple[Any, ...] = (
+    Entry,
+    WritingElement,
+    ReadingElement,
+    Sense,
+    Gloss,
+    LSource,
+    GlossToken,
+    ReadingWriting,
+    ReadingSense,
+    WritingSense,
+)
+# Keys of the related instances returned by parse for each model after Entry
+RELATED_KEYS = (
+    "writing_elements",
+    "reading_elements",
+    "senses",
+    "glosses",
+    "lsources",
+    "gloss_tokens",
+    "readings_writings",
+    "readings_senses",
+    "writings_senses",
+)
+
+
+async def create_schema(db: Gino) -> None:
+    """Create the JMdict tables and any of their indexes which are missing.
+
+    create_all skips existing tables along with their indexes, so indexes added
+    since the tables were created are created separately.
+    """
+    await db.gino.create_all(tables=[model.__table__ for model in MODELS])
+    for model in MODELS:
+        for index in model.__table__.indexes:
+            ddl = str(CreateIndex(index).compile(dialect=db.bind.dialect))
+            await db.status(
+                db.text(ddl.replace("CREATE INDEX", "CREATE INDEX IF NOT EXISTS", 1))
+            )
+
+
+async def import_file(db: Gino, filepath: str, batch_size: int = 2000) -> int:
+    """Replace the contents of the JMdict tables with the entries of a JMdict file.
+
+    Returns the number of entries imported.
+    """
+    count = 0
+    async with db.transaction():
+        for model in reversed(MODELS):
+            await model.delete.gino.status()
+        batch: Dict[Any, List[dict]] = {model: [] for model in MODELS}
+
+        async def flush() -> None:
+            for model, rows in batch.items():
+                if rows:
+                    await model.insert().gino.all(rows)
+                    rows.clear()
+
+        for entry, related in parse(filepath):
+            batch[Entry].append(entry.to_dict())
+            for model, key in zip(MODELS[1:], RELATED_KEYS):
+                batch[model].extend(instance.to_dict() for instance in related[key])
+            count += 1
+            if count % batch_size == 0:
+                await flush()
+        await flush()
+    return count
+
+
+async def rebuild_gloss_tokens(db: Gino, batch_size: int = 10000) -> int:
+    """Fill JMdict_GlossToken from the English glosses already in the database.
+
+    For databases imported before the gloss token index existed. Returns the
+    number of postings.
+    """
+    priorities: Dict[int, List[str]] = {}
+    for model in (WritingElement, ReadingElement):
+        for entry_id, priority in await db.select(
+            [model.entry_id, model.priority]
+        ).gino.all():
+            priorities.setdefault(entry_id, []).extend(priority)
+
+    glosses = await (
+        db.select([Gloss.entry_id, Gloss.sense_index, Gloss.text])
+        .where(Gloss.lang == "eng")
+        .where(Gloss.text.isnot(None))
+        .order_by(Gloss.entry_id)
+        .gino.all()
+    )
+    postings: List[dict] = []
+    gloss_tokens: Dict[Tuple[str, int], GlossToken] = {}
+    last_entry_id = None
+    for entry_id, sense_index, text in glosses:
+        if entry_id != last_entry_id:
+            postings.extend(posting.to_dict() for posting in gloss_tokens.values())
+            gloss_tokens = {}
+            last_entry_id = entry_id
+        rank = priority_rank(priorities.get(entry_id, ()))
+        index_gloss(gloss_tokens, entry_id, sense_index, rank, text)
+    postings.extend(posting.to_dict() for posting in gloss_tokens.values())
+
+    async with db.transaction():
+        await GlossToken.delete.gino.status()
+        for start in range(0, len(postings), batch_size):
+            await GlossToken.insert().gino.all(postings[start : start + batch_size])
+    return len(postings)
+
+
+async def main(argv: List[str]) -> None:
+    db: Gino = Botto.db
+    await db.set_bind(botto.config["DATABASE_URI"])
+    try:
+        await create_schema(db)
+        if argv:
+            print(f"Imported {await import_file(db, argv[0])} entries.")
+        else:
+            print(f"Indexed {await rebuild_gloss_tokens(db)} gloss tokens.")
+    finally:
+        await db.pop_bind().close()
+
+
+if __name__ == "__main__":
+    # python -m botto.utils.jmdict JMdict_e.xml
+    #     Create the tables and indexes, and import every entry of a JMdict file
+    # python -m botto.utils.jmdict
+    #     Create missing tables and indexes, and index already imported glosses
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,273 @@
+"""Logging set up to keep file writes off the event loop.
+
+Loggers only put records on a queue. A listener thread formats and writes them
+to rotating log files, flushing in batches rather than after every record.
+"""
+
+import datetime
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import tempfile
+import time
+from typing import IO, Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+import botto
+
+TEXT_FORMAT = "[{asctime}] [{levelname:>8}] {name}: {message}"
+# The time at the start of lines of either format, continuation lines have none
+TIME_PATTERN = re.compile(
+    rb'^(?:\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)|\{"time": "([^"]+)")'
+)
+CHUNK_SIZE = 64 * 1024
+SLOW_QUERY_LOGGER = "botto.slowquery"
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as JSON objects, one per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "time": datetime.datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False)
+
+
+class BufferedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotating file handler which flushes at most once per flush_interval.
+
+    Records of level ERROR and above are flushed right away.
+    """
+
+    def __init__(self, *args: Any, flush_interval: float = 1.0, **kwargs: Any) -> None:
+        self.flush_interval: float = flush_interval
+        self._last_flush: float = time.monotonic()
+        super().__init__(*args, **kwargs)
+
+    def flush(self) -> None:
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.force_flush()
+
+    def force_flush(self) -> None:
+        super().flush()
+        self._last_flush = time.monotonic()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        super().emit(record)
+        if record.levelno >= logging.ERROR:
+            self.force_flush()
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """Queue listener which flushes buffered handlers when the queue is idle."""
+
+    def __init__(
+        self, log_queue: queue.Queue, *handlers: logging.Handler, flush_interval: float
+    ) -> None:
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        # self.queue is typed as any object with a get taking no arguments
+        self.log_queue: queue.Queue = log_queue
+        self.flush_interval: float = flush_interval
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        while True:
+            try:
+                return self.log_queue.get(block, timeout=self.flush_interval)
+            except queue.Empty:
+                self.flush()
+
+    def flush(self) -> None:
+        for handler in self.handlers:
+            getattr(handler, "force_flush", handler.flush)()
+
+    def stop(self) -> None:
+        super().stop()
+        self.flush()
+
+
+def log_file(key: str, default: str, cluster: Optional[Union[int, str]]) -> str:
+    """Return the path of a configured log file.
+
+    Processes of a cluster each write their own files, named like botto-0.log.
+    """
+    path: str = botto.config.get(key, default)
+    if cluster is None:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}-{cluster}{extension}"
+
+
+def setup_logging(cluster: Optional[Union[int, str]] = None) -> BatchingQueueListener:
+    """Route the botto and discord loggers through a queue, see config-example.yml.
+
+    The returned listener must be started, and stopped on exit to write the
+    remaining records. cluster is the ID of the cluster of the process, or
+    "launcher", when run by the cluster launcher.
+    """
+    config = botto.config
+    flush_interval: float = config.get("LOG_FLUSH_INTERVAL", 1.0)
+    formatter: logging.Formatter
+    if config.get("LOG_FORMAT", "text") == "json":
+        formatter = JSONFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT, style="{")
+
+    def file_handler(key: str, default: str) -> BufferedRotatingFileHandler:
+        handler = BufferedRotatingFileHandler(
+            log_file(key, default, cluster),
+            encoding="utf-8",
+            maxBytes=config.get("LOG_MAX_BYTES", 10 * 2 ** 20),
+            backupCount=config.get("LOG_BACKUP_COUNT", 5),
+            flush_interval=flush_interval,
+        )
+        handler.setFormatter(formatter)
+        return handler
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+    error_file_handler = file_handler("ERROR_LOG_FILE", "error.log")
+    error_file_handler.setLevel(logging.ERROR)
+    handlers: List[logging.Handler] = [
+        stream_handler,
+        file_handler("LOG_FILE", "botto.log"),
+        error_file_handler,
+    ]
+    # Statements slower than SLOW_QUERY_THRESHOLD_MS, kept out of the main logs
+    slow_query_handler = file_handler("SLOW_QUERY_LOG_FILE", "slowquery.log")
+    slow_query_handler.addFilter(logging.Filter(SLOW_QUERY_LOGGER))
+    for handler in handlers:
+        handler.addFilter(lambda record: record.name != SLOW_QUERY_LOGGER)
+    handlers.append(slow_query_handler)
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+
+    dpy_logger = logging.getLogger("discord")
+    dpy_logger.setLevel(logging.WARNING)
+    logger = logging.getLogger("botto")
+    logger.setLevel(logging.INFO)
+    slow_query_logger = logging.getLogger(SLOW_QUERY_LOGGER)
+    slow_query_logger.propagate = False
+    for each in (dpy_logger, logger, slow_query_logger):
+        each.addHandler(queue_handler)
+
+    return BatchingQueueListener(log_queue, *handlers, flush_interval=flush_interval)
+
+
+# ------ Reading ------
+
+
+def parse_line_time(line: bytes) -> Optional[datetime.datetime]:
+    match = TIME_PATTERN.match(line)
+    if match is None:
+        return None
+    try:
+        if match.group(1):
+            return datetime.datetime.strptime(
+                match.group(1).decode(), "%Y-%m-%d %H:%M:%S"
+            )
+        return datetime.datetime.fromisoformat(match.group(2).decode())
+    except ValueError:
+        return None
+
+
+def tail_offset(path: str, count: int) -> int:
+    """Return the offset of the start of the last count lines of a file.
+
+    The file is read backwards in chunks, so only the tail is read.
+    """
+    with open(path, "rb") as file:
+        position = file.seek(0, os.SEEK_END)
+        if position == 0:
+            return 0
+        file.seek(position - 1)
+        # A trailing newline ends the last line rather than starting another one
+        newlines = -1 if file.read(1) == b"\n" else 0
+        while position > 0:
+            size = min(CHUNK_SIZE, position)
+            position -= size
+            file.seek(position)
+            chunk = file.read(size)
+            index = len(chunk)
+            while True:
+                index = chunk.rfind(b"\n", 0, index)
+                if index < 0:
+                    break
+                newlines += 1
+                if newlines == count:
+                    return position + index + 1
+    return 0
+
+
+def _next_entry(
+    file: IO[bytes], position: int
+) -> Tuple[int, Optional[datetime.datetime]]:
+    # Offset and time of the first timestamped line starting at or after position
+    if position > 0:
+        file.seek(position - 1)
+        file.readline()
+    else:
+        file.seek(0)
+    while True:
+        offset = file.tell()
+        line = file.readline()
+        if not line:
+            return offset, None
+        when = parse_line_time(line)
+        if when is not None:
+            return offset, when
+
+
+def time_offset(path: str, when: datetime.datetime) -> int:
+    """Return the offset of the first line logged at or after when.
+
+    Log lines are in time order, so this bisects the file on byte offsets.
+    """
+    with open(path, "rb") as file:
+        low, high = 0, file.seek(0, os.SEEK_END)
+        while low < high:
+            middle = (low + high) // 2
+            offset, logged = _next_entry(file, middle)
+            if logged is None or logged >= when:
+                high = middle
+            else:
+                low = offset + 1
+        return _next_entry(file, low)[0]
+
+
+def export_range(
+    path: str, start: int, end: int, *, compress: bool = False
+) -> BinaryIO:
+    """Copy a byte range of a file into a temporary file, gzipped if compress.
+
+    The range is copied in chunks, the returned file is at its start.
+    """
+    output: BinaryIO = tempfile.TemporaryFile()  # type: ignore
+    writer: Union[BinaryIO, gzip.GzipFile] = output
+    if compress:
+        writer = gzip.GzipFile(fileobj=output, mode="wb")
+    with open(path, "rb") as file:
+        file.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            writer.write(chunk)
+            remaining -= len(chunk)
+    if compress:
+        writer.close()
+    output.seek(0)
+    return output
@@ -7,10 +7,13 @@ GitHub source: https://github.com/Rapptz/RoboDanny/blob/rewrite/cogs/utils/pagin
 """
 
 import asyncio
+import inspect
 
 import discord
+from discord.ext import commands
 
 import botto
+from .timerwheel import TimerWheel
 
 FIRST_PAGE = "\N{BLACK LEFT-POINTING DOUBLE TRIANGLE WITH VERTICAL BAR}"
 PREVIOUS_PAGE = "\N{BLACK LEFT-POINTING TRIANGLE}"
@@ -34,8 +37,12 @@ class EmbedPaginator:
         The context of the command.
     entries: List[str]
         A list of entries to paginate.
+    pages: Iterable[Callable[[], Union[str, Awaitable[str]]]]
+        Page factories to paginate instead of entries, one page each.
+        They are only called when their page is shown for the first time.
+        If it is not a sequence, the number of pages is unknown until it is exhausted.
     per_page: int
-        How many entries show up per page.
+        How many entries show up per page. Ignored if pages are given.
     message_content: Optional[str]
         The message content along with the embed.
     show_entry_count: bool
@@ -58,7 +65,8 @@ class EmbedPaginator:
         self,
         ctx,
         *,
-        entries,
+        entries=None,
+        pages=None,
         per_page=12,
         message_content=None,
         show_entry_count=True,
@@ -72,19 +80,37 @@ class EmbedPaginator:
         self.channel = ctx.channel
         self.author = ctx.author
 
+        if (entries is None) == (pages is None):
+            raise TypeError("Either entries or pages must be given.")
+
         self.entries = entries
-        self.per_page = per_page
+        self.per_page = per_page if pages is None else 1
         self.message_content = message_content
         self.show_entry_count = show_entry_count
         self.numbered = numbered
         self.help_option = help_option
-        pages, left_over = divmod(len(self.entries), self.per_page)
-        pages += bool(left_over)
         self.current_page = 0
-        self.maximum_pages = pages
+
+        self._rendered = {}
+        self._factories = None
+        self._factory_iter = None
+        if entries is not None:
+            maximum_pages, left_over = divmod(len(entries), self.per_page)
+            self.maximum_pages = maximum_pages + bool(left_over)
+        elif hasattr(pages, "__len__") and hasattr(pages, "__getitem__"):
+            self._factories = pages
+            self.maximum_pages = len(pages)
+        else:
+            # Unknown length, factories are pulled from the iterator as needed
+            self._factories = []
+            self._factory_iter = iter(pages)
+            self.maximum_pages = None
+
         self.embed = discord.Embed(colour=botto.config["MAIN_COLOUR"])
-        self.paginating = len(entries) > per_page
-        self.match = None
+        self.paginating = self.page_exists(2)
+        self.reaction_task = None
+        self.timeout = 120.0
+        self.actions = asyncio.Queue()
         self.reaction_emojis = [
             (FIRST_PAGE, self.first_page),
             (PREVIOUS_PAGE, self.previous_page),
@@ -98,24 +124,63 @@ class EmbedPaginator:
             self.reaction_emojis.remove((GOTO_PAGE, self.numbered_page))
         if not help_option:
             self.reaction_emojis.remove((GOTO_HELP, self.show_help))
+        self.emoji_actions = dict(self.reaction_emojis)
+
+    def _pull_factories(self, count=None):
+        """Pull page factories from the iterator until there are count of them."""
+        while self._factory_iter is not None and (
+            count is None or len(self._factories) < count
+        ):
+            try:
+                self._factories.append(next(self._factory_iter))
+            except StopIteration:
+                self._factory_iter = None
+                self.maximum_pages = len(self._factories)
+
+    def page_exists(self, page):
+        if page < 1:
+            return False
+        if self.maximum_pages is None:
+            self._pull_factories(page)
+            return page <= len(self._factories)
+        return page <= self.maximum_pages
 
     def get_page(self, page):
         base = (page - 1) * self.per_page
         return self.entries[base : base + self.per_page]
 
+    async def render_page(self, page):
+        """Call the page factory of a page once and return its content."""
+        try:
+            return self._rendered[page]
+        except KeyError:
+            pass
+        content = self._factories[page - 1]()
+        if inspect.isawaitable(content):
+            content = await content
+        self._rendered[page] = content
+        return content
+
     async def show_page(self, page, *, first=False):
         self.current_page = page
-        entries = self.get_page(page)
         lines = []
-        if self.numbered:
+        if self.entries is None:
+            lines.append(await self.render_page(page))
+        elif self.numbered:
+            entries = self.get_page(page)
             for index, entry in enumerate(entries, 1 + ((page - 1) * self.per_page)):
                 lines.append(f"{index}. {entry}")
         else:
-            lines.extend(f"{entry}" for entry in entries)
-
-        if self.maximum_pages > 1:
-            if self.show_entry_count:
-                text = f"Page {page}/{self.maximum_pages} ({len(self.entries)} entries)"
+            lines.extend(f"{entry}" for entry in self.get_page(page))
+
+        if self.page_exists(2):
+            if self.maximum_pages is None:
+                text = f"Page {page}/?"
+            elif self.show_entry_count:
+                count = (
+                    self.maximum_pages if self.entries is None else len(self.entries)
+                )
+                text = f"Page {page}/{self.maximum_pages} ({count} entries)"
             else:
                 text = f"Page {page}/{self.maximum_pages}"
 
@@ -137,15 +202,32 @@ class EmbedPaginator:
         self.embed.description = "\n".join(lines)
         self.message = await self.ctx.send(self.message_content, embed=self.embed)
 
+        # Reactions are added in the background so the first page and the
+        # interactive loop are not held up by one round trip per reaction
+        self.reaction_task = self.bot.loop.create_task(self.add_reactions())
+
+    async def add_reactions(self):
+        """Add the pagination reactions to the message in order.
+
+        The requests share the channel's rate limit bucket, which the HTTP client
+        already queues and retries on, so sending them at once would only shuffle
+        the order of the buttons.
+        """
         for (reaction, _) in self.reaction_emojis:
             if self.maximum_pages == 2 and reaction in (FIRST_PAGE, LAST_PAGE):
                 # Don't add |<< or >>| buttons if there is only two pages
                 # But we still accept it nonetheless if user reacts
                 continue
-            await self.message.add_reaction(reaction)
+            if not self.paginating:
+                return
+            try:
+                await self.message.add_reaction(reaction)
+            except discord.HTTPException:
+                # Message deleted or permissions changed, no point continuing
+                return
 
     async def checked_show_page(self, page):
-        if page != 0 and page <= self.maximum_pages:
+        if self.page_exists(page):
             await self.show_page(page)
 
     async def first_page(self):
@@ -154,6 +236,7 @@ class EmbedPaginator:
 
     async def last_page(self):
         """Navigate to the last page."""
+        self._pull_factories()
         await self.show_page(self.maximum_pages)
 
     async def next_page(self):
@@ -188,12 +271,12 @@ class EmbedPaginator:
         else:
             page = int(msg.content)
             to_delete.append(msg)
-            if page != 0 and page <= self.maximum_pages:
+            if self.page_exists(page):
                 await self.show_page(page)
             else:
                 to_delete.append(
                     await self.ctx.send(
-                        f"Invalid page given. ({page}/{self.maximum_pages})"
+                        f"Invalid page given. ({page}/{self.maximum_pages or '?'})"
                     )
                 )
                 await asyncio.sleep(5)
@@ -232,6 +315,8 @@ class EmbedPaginator:
         self.paginating = False
 
     async def remove_reactions(self, *, individually=True):
+        if self.reaction_task is not None:
+            self.reaction_task.cancel()
         try:
             await self.message.clear_reactions()
         except Exception:
@@ -247,47 +332,74 @@ class EmbedPaginator:
                 except Exception:
                     pass
 
-    def react_check(self, reaction, user):
-        if user.id != self.author.id:
-            return False
-
-        if reaction.message.id != self.message.id:
-            return False
-
-        for (emoji, func) in self.reaction_emojis:
-            if reaction.emoji == emoji:
-                self.match = func
-                return True
-        return False
-
     async def paginate(self):
         """Paginate the entries and run the interactive loop if necessary."""
-        first_page = self.show_page(1, first=True)
+        # Only the message itself is awaited, reactions are added in the background
+        # so reactions can be listened to right away if we're paginating
+        await self.show_page(1, first=True)
         if not self.paginating:
-            await first_page
-        else:
-            # Allow us to react to reactions right away if we're paginating
-            self.bot.loop.create_task(first_page)
-
-        while self.paginating:
-            done, pending = await asyncio.wait(
-                [
-                    self.bot.wait_for(
-                        "reaction_add", check=self.react_check, timeout=120
-                    ),
-                    self.bot.wait_for(
-                        "reaction_remove", check=self.react_check, timeout=120
-                    ),
-                ],
-                return_when=asyncio.FIRST_COMPLETED,
-            )
-            try:
-                done.pop().result()
-            except asyncio.TimeoutError:
-                self.paginating = False
-                self.bot.loop.create_task(self.remove_reactions())
-            else:
-                await self.match()
-            finally:
-                for future in pending:
-                    future.cancel()
+            return
+
+        registry = self.bot.get_cog("PaginatorRegistry")
+        registry.register(self)
+        try:
+            while self.paginating:
+                action = await self.actions.get()
+                if action is None:  # Timed out
+                    self.paginating = False
+                    self.bot.loop.create_task(self.remove_reactions())
+                else:
+                    await action()
+        finally:
+            registry.unregister(self)
+
+
+class PaginatorRegistry(commands.Cog):
+    """Routes reaction events and idle timeouts to active paginators.
+
+    Paginators are indexed by message ID so every raw reaction event costs one
+    dictionary lookup, however many paginators are open. Idle timeouts of all
+    paginators are handled by a single timer wheel.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.paginators = {}
+        self.timeouts = TimerWheel(self.expire, loop=bot.loop)
+        self.timeouts.start()
+
+    def cog_unload(self):
+        self.timeouts.stop()
+        for message_id in list(self.paginators):
+            self.expire(message_id)
+
+    def register(self, paginator):
+        self.paginators[paginator.message.id] = paginator
+        self.timeouts.schedule(paginator.message.id, paginator.timeout)
+
+    def unregister(self, paginator):
+        self.paginators.pop(paginator.message.id, None)
+        self.timeouts.cancel(paginator.message.id)
+
+    def expire(self, message_id):
+        paginator = self.paginators.pop(message_id, None)
+        if paginator is not None:
+            paginator.actions.put_nowait(None)
+
+    def route(self, payload):
+        paginator = self.paginators.get(payload.message_id)
+        if paginator is None or payload.user_id != paginator.author.id:
+            return
+        action = paginator.emoji_actions.get(str(payload.emoji))
+        if action is None:
+            return
+        self.timeouts.schedule(payload.message_id, paginator.timeout)
+        paginator.actions.put_nowait(action)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload):
+        self.route(payload)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload):
+        self.route(payload)
@@ -0,0 +1,40 @@
+import functools
+import re
+from typing import Any, Dict, Iterable
+
+# A word made of Hepburn or Kunrei syllables, with doubled consonants for small
+# tsu and n' before vowels, eg. taberu, kitte, kon'ya or matcha
+ROMAJI_WORD_PATTERN = re.compile(
+    r"(?:[aiueo]|n(?![aiueoy])|n'|(?:[kgsztdnhbpmr]y?|ch|sh|ts|[fjwyv])[aiueo]"
+    r"|([kgsztdhbpmrfjc])(?=\1)|t(?=ch))+"
+)
+
+
+@functools.lru_cache(maxsize=None)
+def get_romanizer() -> Any:
+    """Return the kana converter, importing kanaconv and building it on first use."""
+    from kanaconv import KanaConv  # type: ignore
+
+    return KanaConv()
+
+
+@functools.lru_cache(maxsize=8192)
+def to_romaji(kana: str) -> str:
+    """Convert kana to romaji, memoizing recent conversions."""
+    return get_romanizer().to_romaji(kana)
+
+
+def to_romaji_bulk(readings: Iterable[str]) -> Dict[str, str]:
+    """Convert many readings at once, each distinct reading is converted once."""
+    return {reading: to_romaji(reading) for reading in set(readings) if reading}
+
+
+def is_romaji(text: str) -> bool:
+    """Whether every word of a text can be read as romaji.
+
+    Many short English words can as well, eg. "name" or "house".
+    """
+    words = text.lower().split()
+    return bool(words) and all(
+        ROMAJI_WORD_PATTERN.fullmatch(word.replace("-", "")) for word in words
+    )
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from typing import Callable, Dict, Generic, Hashable, List, Optional, Set, TypeVar
+
+logger = logging.getLogger("botto.timerwheel")
+
+KeyT = TypeVar("KeyT", bound=Hashable)
+
+
+class TimerWheel(Generic[KeyT]):
+    """Hashed timer wheel calling back with keys whose deadline has passed.
+
+    Scheduling, rescheduling and cancelling a key are O(1) and every tick only
+    looks at the keys of one slot, so thousands of timeouts share a single
+    loop callback. Keys expire at most one resolution late.
+
+    Parameters
+    ------------
+    callback: Callable[[KeyT], None]
+        Called with each expired key. It must not block.
+    resolution: float
+        Seconds per tick.
+    slots: int
+        Number of slots in the wheel.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[KeyT], None],
+        *,
+        resolution: float = 1.0,
+        slots: int = 256,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> None:
+        self.callback = callback
+        self.resolution = resolution
+        self.loop = loop or asyncio.get_event_loop()
+        self._slots: List[Set[KeyT]] = [set() for _ in range(slots)]
+        self._deadlines: Dict[KeyT, float] = {}
+        self._last_tick: int = 0
+        self._handle: Optional[asyncio.TimerHandle] = None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: KeyT) -> bool:
+        return key in self._deadlines
+
+    def _slot(self, deadline: float) -> Set[KeyT]:
+        return self._slots[int(deadline // self.resolution) % len(self._slots)]
+
+    def schedule(self, key: KeyT, delay: float) -> None:
+        """Expire key after delay seconds, replacing its previous deadline."""
+        self.cancel(key)
+        deadline = self.loop.time() + delay
+        self._deadlines[key] = deadline
+        self._slot(deadline).add(key)
+
+    def cancel(self, key: KeyT) -> None:
+        deadline = self._deadlines.pop(key, None)
+        if deadline is not None:
+            self._slot(deadline).discard(key)
+
+    def deadline(self, key: KeyT) -> Optional[float]:
+        return self._deadlines.get(key)
+
+    def start(self) -> None:
+        if self._handle is not None:
+            return
+        self._last_tick = int(self.loop.time() // self.resolution) - 1
+        self._schedule_run()
+
+    def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _schedule_run(self) -> None:
+        next_tick = int(self.loop.time() // self.resolution) + 1
+        self._handle = self.loop.call_at(next_tick * self.resolution, self._run)
+
+    def _run(self) -> None:
+        tick = int(self.loop.time() // self.resolution)
+        try:
+            # Only fully elapsed ticks are processed, catching up if the loop was late
+            first = max(self._last_tick + 1, tick - len(self._slots))
+            for current in range(first, tick):
+                slot = self._slots[current % len(self._slots)]
+                for key in list(slot):
+                    deadline = self._deadlines.get(key)
+                    # Keys of later rotations share the slot and stay, and keys
+                    # may have been cancelled by the callback of another key
+                    if deadline is None or int(deadline // self.resolution) > current:
+                        continue
+                    slot.discard(key)
+                    del self._deadlines[key]
+                    try:
+                        self.callback(key)
+                    except Exception:  # pylint: disable=broad-except
+                        logger.exception("Timer wheel callback failed for %r.", key)
+        finally:
+            # The wheel keeps ticking whatever happened to this tick
+            self._last_tick = tick - 1
+            self._schedule_run()